@@ -0,0 +1,5 @@
+from os.path import dirname, basename, isfile, join
+import glob
+
+modules = glob.glob(join(dirname(__file__), "*"))
+__all__ = [basename(f) for f in modules if not isfile(f)]
@@ -5,6 +5,7 @@ import json
 import logging
 import time
 from django.db import transaction
+from django.db.models import Q
 
 from EnigmaAutomation.settings import (
     DECLINE_REASONS,
@@ -20,6 +21,7 @@ from Access.models import (
     GroupV2,
     AccessV2,
     MembershipV2,
+    UserIdentity,
     ApprovalType,
 )
 from Access.background_task_manager import accept_request
@@ -419,6 +421,7 @@ def create_request(auth_user, access_request_form):
     json_response["status_list"] = []
     extra_fields = get_extra_fields(access_request=access_request)
 
+    new_access_requests = []
     for index1, access_tag in enumerate(access_request["accessRequests"]):
         access_labels = validate_access_labels(
             access_labels_json=access_request["accessLabel"][index1],
@@ -439,7 +442,7 @@ def create_request(auth_user, access_request_form):
             .strftime("%Y-%m-%d %H:%M:%S") + "  UTC",
         }
 
-        access_module = helpers.get_available_access_modules()[access_tag]
+        access_module = helpers.get_available_access_module_from_tag(access_tag)
         module_access_labels = access_module.validate_request(
             access_labels, auth_user, is_group=False
         )
@@ -453,101 +456,195 @@ def create_request(auth_user, access_request_form):
 
         for index2, access_label in enumerate(module_access_labels):
             request_id = request_id + "_" + str(index2)
-            access_create_error = _create_access(
-                auth_user=auth_user,
-                access_label=access_label,
-                access_tag=access_tag,
-                request_id=request_id,
-                access_reason=access_reason,
+            new_access_requests.append(
+                {
+                    "access_module": access_module,
+                    "user": auth_user.user,
+                    "access_tag": access_tag,
+                    "access_label": access_label,
+                    "request_id": request_id,
+                    "access_reason": access_reason,
+                }
             )
-            if "title" not in access_create_error or access_create_error["title"] != "success":
-                json_response["status_list"].append(access_create_error)
-                continue
-
-            if access_module.can_auto_approve():
-                # start approval in celery
-                json_response["status_list"].append(
-                    {
-                        "title":
-                            REQUEST_ACCESS_AUTO_APPROVED_MSG["title"].format(
-                                request_id
-                            ),
-                        "msg": REQUEST_ACCESS_AUTO_APPROVED_MSG["msg"],
-                    }
-                )
-                raise Exception("Implementation pending")
 
+    access_create_errors = create_access_requests(new_access_requests)
+    for new_access_request, access_create_error in zip(
+        new_access_requests, access_create_errors
+    ):
+        if "title" not in access_create_error or access_create_error["title"] != "success":
+            json_response["status_list"].append(access_create_error)
+            continue
+
+        request_id = new_access_request["request_id"]
+        if new_access_request["access_module"].can_auto_approve():
+            # start approval in celery
             json_response["status_list"].append(
                 {
-                    "title": REQUEST_SUCCESS_MSG["title"].format(request_id=request_id),
-                    "msg": REQUEST_SUCCESS_MSG["msg"].format(
-                        access_label=json.dumps(access_label)
-                    ),
+                    "title":
+                        REQUEST_ACCESS_AUTO_APPROVED_MSG["title"].format(
+                            request_id
+                        ),
+                    "msg": REQUEST_ACCESS_AUTO_APPROVED_MSG["msg"],
                 }
             )
+            raise Exception("Implementation pending")
+
+        json_response["status_list"].append(
+            {
+                "title": REQUEST_SUCCESS_MSG["title"].format(request_id=request_id),
+                "msg": REQUEST_SUCCESS_MSG["msg"].format(
+                    access_label=json.dumps(new_access_request["access_label"])
+                ),
+            }
+        )
 
     return json_response
 
 
-def _create_access(
-        auth_user, access_label, access_tag, request_id, access_reason):
-    user_identity = auth_user.user.get_active_identity(access_tag=access_tag)
-    if not user_identity:
-        return {
-            "title": REQUEST_IDENTITY_NOT_SETUP_ERR_MSG["error_msg"],
-            "msg": REQUEST_IDENTITY_NOT_SETUP_ERR_MSG["msg"].format(
-                access_tag=access_tag
-            ),
-        }
+def _get_access_key(access_tag, access_label):
+    return access_tag, json.dumps(access_label, sort_keys=True)
 
-    access = AccessV2.get(access_tag=access_tag, access_label=access_label)
-    if not access:
-        try:
-            _create_access_mapping(
-                access_tag=access_tag,
-                access_label=access_label,
-                user_identity=user_identity,
-                request_id=request_id,
-                access_reason=access_reason,
+
+def _get_accesses(access_keys):
+    """ Existing AccessV2 of the (access_tag, access_label) keys, in one query """
+    if not access_keys:
+        return {}
+    labels_filter = Q()
+    for access_tag, access_label in access_keys:
+        labels_filter |= Q(access_tag=access_tag, access_label=json.loads(access_label))
+    accesses = {}
+    for access in AccessV2.objects.filter(labels_filter).order_by("id"):
+        accesses.setdefault(
+            _get_access_key(access.access_tag, access.access_label), access
+        )
+    return accesses
+
+
+def create_access_requests(access_requests):
+    """Create the AccessV2 and UserAccessMapping rows of the access requests.
+
+    Each request is a dict of the requesting "user", "access_tag",
+    "access_label", "request_id" and "access_reason", with optional "status"
+    and "approver_1" of the new mapping. Identities, existing accesses and
+    duplicate requests are looked up once for all the requests and the new
+    rows are bulk inserted in one transaction. Returns the creation status
+    of each request, in order.
+    """
+    user_identities = {
+        (user_identity.user_id, user_identity.access_tag): user_identity
+        for user_identity in UserIdentity.objects.filter(
+            user__in={access_request["user"] for access_request in access_requests},
+            access_tag__in={
+                access_request["access_tag"] for access_request in access_requests
+            },
+            status="Active",
+        )
+    }
+    access_keys = {
+        _get_access_key(access_request["access_tag"], access_request["access_label"])
+        for access_request in access_requests
+        if (access_request["user"].id, access_request["access_tag"]) in user_identities
+    }
+    accesses = _get_accesses(access_keys)
+    requested_accesses = set(
+        UserAccessMapping.objects.filter(
+            user_identity__in=user_identities.values(),
+            access__in=accesses.values(),
+            status__in=["Approved", "Pending"],
+        ).values_list("user_identity_id", "access_id")
+    ) if accesses else set()
+
+    access_create_errors = []
+    new_mappings = []
+    requested_access_keys = set()
+    for access_request in access_requests:
+        access_tag = access_request["access_tag"]
+        user_identity = user_identities.get((access_request["user"].id, access_tag))
+        if not user_identity:
+            access_create_errors.append(
+                {
+                    "title": REQUEST_IDENTITY_NOT_SETUP_ERR_MSG["error_msg"],
+                    "msg": REQUEST_IDENTITY_NOT_SETUP_ERR_MSG["msg"].format(
+                        access_tag=access_tag
+                    ),
+                }
             )
-        except Exception:
-            return {
-                "title": REQUEST_DB_ERR_MSG["error_msg"],
-                "msg": REQUEST_DB_ERR_MSG["msg"],
-            }
-        return {"title": "success", "msg": "success"}
+            continue
+
+        access_key = _get_access_key(access_tag, access_request["access_label"])
+        access = accesses.get(access_key)
+        # the same access asked twice for the identity is a duplicate as well
+        requested_access_key = (user_identity.id, access_key)
+        if requested_access_key in requested_access_keys or (
+            access and (user_identity.id, access.id) in requested_accesses
+        ):
+            access_create_errors.append(
+                {
+                    "title": REQUEST_DUPLICATE_ERR_MSG["title"].format(
+                        access_tag=access_tag
+                    ),
+                    "msg": REQUEST_DUPLICATE_ERR_MSG["msg"].format(
+                        access_label=json.dumps(access_request["access_label"])
+                    ),
+                }
+            )
+            continue
 
-    if user_identity.access_mapping_exists(access):
-        return {
-            "title": REQUEST_DUPLICATE_ERR_MSG["title"].format(
-                access_tag=access.access_tag
-            ),
-            "msg": REQUEST_DUPLICATE_ERR_MSG["msg"].format(
-                access_label=json.dumps(access.access_label)
-            ),
-        }
+        requested_access_keys.add(requested_access_key)
+        new_mappings.append((access_request, user_identity, access_key))
+        access_create_errors.append({"title": "success", "msg": "success"})
 
-    user_identity.user_access_mapping.create(
-        request_id=request_id,
-        request_reason=access_reason,
-        access=access,
-    )
-    return {"title": "success", "msg": "success"}
+    if not new_mappings:
+        return access_create_errors
 
+    try:
+        _create_access_mappings(new_mappings, accesses)
+    except Exception as e:
+        logger.exception("Error saving access requests: %s", e)
+        db_error = {
+            "title": REQUEST_DB_ERR_MSG["error_msg"],
+            "msg": REQUEST_DB_ERR_MSG["msg"],
+        }
+        access_create_errors = [
+            db_error if access_create_error["title"] == "success"
+            else access_create_error
+            for access_create_error in access_create_errors
+        ]
+    return access_create_errors
 
-@transaction.atomic
-def _create_access_mapping(
-    user_identity, access_tag, access_label, request_id, access_reason
-):
-    """ Create AccessV2 and UserAccessMapping in db """
-    access = AccessV2.objects.create(
-        access_tag=access_tag, access_label=access_label
-    )
 
-    user_identity.user_access_mapping.create(
-        request_id=request_id, request_reason=access_reason, access=access
+@transaction.atomic
+def _create_access_mappings(new_mappings, accesses):
+    """ Bulk create the missing AccessV2 and the UserAccessMapping in db """
+    new_access_keys = [
+        access_key for _, _, access_key in new_mappings if access_key not in accesses
+    ]
+    if new_access_keys:
+        new_accesses = AccessV2.objects.bulk_create(
+            [
+                AccessV2(access_tag=access_tag, access_label=json.loads(access_label))
+                for access_tag, access_label in new_access_keys
+            ]
+        )
+        if all(access.pk for access in new_accesses):
+            accesses.update(zip(new_access_keys, new_accesses))
+        else:
+            # ids are not returned by bulk inserts on MySQL
+            accesses.update(_get_accesses(new_access_keys))
+
+    UserAccessMapping.objects.bulk_create(
+        [
+            UserAccessMapping(
+                request_id=access_request["request_id"],
+                request_reason=access_request["access_reason"],
+                user_identity=user_identity,
+                access=accesses[access_key],
+                approver_1=access_request.get("approver_1"),
+                status=access_request.get("status", "Pending"),
+            )
+            for access_request, user_identity, access_key in new_mappings
+        ]
     )
-    return access
 
 
 def get_extra_field_labels(access_module):
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class AccessConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "Access"
+
+    def ready(self):
+        from Access import helpers, notifications
+        # registers the signal receivers invalidating cached context data
+        # and cached group access lists, and provisioning identities at login
+        from Access import context_processors, group_access_list  # NOQA
+        from Access import userlist_helper  # NOQA
+
+        helpers.preload_templates(notifications.NOTIFICATION_TEMPLATES)
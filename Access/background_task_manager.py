@@ -1,22 +1,34 @@
+import datetime
 import json
 import threading
 import traceback
 import logging
 
-from celery import shared_task
+from django.db import transaction
+from django.utils import timezone
+from celery import group, shared_task
 from celery.signals import task_success, task_failure
 
 from Access import helpers
-from Access.models import UserAccessMapping
+from Access.models import (
+    User,
+    UserAccessMapping,
+    AccessGrantDigestEntry,
+    OutboundNotification,
+)
 from Access import notifications
+from bootprocess import general
+from EnigmaAutomation.settings import BACKGROUND_TASK_MANAGER_TYPE
 
 logger = logging.getLogger(__name__)
 
+OUTBOUND_NOTIFICATION_BATCH_SIZE = 50
+# a digest still pending this long after its window was not sent by its
+# scheduled task, lost with the process or broker holding it
+ACCESS_GRANT_DIGEST_SWEEP_GRACE_SECONDS = 300
+
 
-with open("config.json") as data_file:
-    background_task_manager_type = json.load(data_file)["background_task_manager"][
-        "type"
-    ]
+background_task_manager_type = BACKGROUND_TASK_MANAGER_TYPE
 
 
 def background_task(func, *args):
@@ -31,6 +43,20 @@ def background_task(func, *args):
         elif func == "run_access_revoke":
             request_id = args[0]
             run_access_revoke.delay(request_id)
+        elif func == "run_access_grant_batch":
+            request_ids = args[0]
+            group(
+                run_access_grant.s(request_id) for request_id in request_ids
+            ).apply_async()
+        elif func == "run_access_revoke_batch":
+            request_ids = args[0]
+            group(
+                run_access_revoke.s(request_id) for request_id in request_ids
+            ).apply_async()
+        elif func == "run_default_group_enrollment":
+            run_default_group_enrollment.delay(*args)
+        elif func == "run_default_group_backfill":
+            run_default_group_backfill.delay()
     else:
         if func == "run_access_grant":
             request_id = args[0]
@@ -49,6 +75,24 @@ def background_task(func, *args):
             access_revoke_thread = threading.Thread(target=run_access_revoke, args=args)
 
             access_revoke_thread.start()
+        elif func == "run_access_grant_batch":
+            access_grant_thread = threading.Thread(
+                target=run_access_grant_batch, args=args
+            )
+            access_grant_thread.start()
+        elif func == "run_access_revoke_batch":
+            access_revoke_thread = threading.Thread(
+                target=run_access_revoke_batch, args=args
+            )
+            access_revoke_thread.start()
+        elif func == "run_default_group_enrollment":
+            enrollment_thread = threading.Thread(
+                target=run_default_group_enrollment, args=args
+            )
+            enrollment_thread.start()
+        elif func == "run_default_group_backfill":
+            backfill_thread = threading.Thread(target=run_default_group_backfill)
+            backfill_thread.start()
 
 
 @shared_task(
@@ -173,8 +217,7 @@ def run_access_revoke(request_id):
     user_identity = access_mapping.user_identity
 
     revoker = access_mapping.revoker
-    access_modules = helpers.get_available_access_modules()
-    access_module = access_modules[access.access_tag]
+    access_module = helpers.get_available_access_module_from_tag(access.access_tag)
     if not revoker:
         logger.debug(f"The revoker is not set for the request with id {request_id}")
         access_mapping.revoke_failed("Revoker was not set.")
@@ -239,6 +282,162 @@ def run_access_revoke(request_id):
     return True
 
 
+def run_access_grant_batch(request_ids):
+    # a failed grant must not stop the rest of the batch
+    for request_id in request_ids:
+        try:
+            run_access_grant(request_id)
+        except Exception:
+            logger.exception("Grant failed for request %s", request_id)
+
+
+def run_access_revoke_batch(request_ids):
+    # a failed revoke must not stop the rest of the batch
+    for request_id in request_ids:
+        try:
+            run_access_revoke(request_id)
+        except Exception:
+            logger.exception("Revoke failed for request %s", request_id)
+
+
+@shared_task(
+    autoretry_for=(Exception,), retry_kwargs={"max_retries": 3, "countdown": 5}
+)
+def run_default_group_enrollment(user_id):
+    # views_helper imports background_task_manager
+    from Access import views_helper
+
+    user = User.objects.get(id=user_id)
+    return views_helper.add_user_to_default_access_group(user)
+
+
+@shared_task
+def run_default_group_backfill():
+    # views_helper imports background_task_manager
+    from Access import views_helper
+
+    return views_helper.enroll_users_missing_from_default_access_group()
+
+
+def schedule_access_grant_digest(digest_key, countdown):
+    if background_task_manager_type == "celery":
+        send_access_grant_digest.apply_async(args=[digest_key], countdown=countdown)
+    else:
+        digest_timer = threading.Timer(
+            countdown, send_access_grant_digest, args=(digest_key,)
+        )
+        digest_timer.start()
+
+
+@shared_task(
+    autoretry_for=(Exception,), retry_kwargs={"max_retries": 3, "countdown": 5}
+)
+def send_access_grant_digest(digest_key):
+    # grants added from now on schedule the next send
+    AccessGrantDigestEntry.clear_send_scheduled(digest_key)
+    entries = AccessGrantDigestEntry.claim_pending_entries(digest_key)
+    if not entries:
+        logger.debug(f"No pending grants found for digest {digest_key}")
+        return True
+
+    entry_ids = [entry.id for entry in entries]
+    access_tag = entries[0].access_tag
+    access_module = helpers.get_available_access_module_from_tag(access_tag)
+    try:
+        if not access_module:
+            raise Exception(f"Access module {access_tag} is not available")
+        access_module.send_digest(entries[0].email_targets, entries)
+    except Exception:
+        logger.exception(
+            "Error while sending access grant digest: " + str(traceback.format_exc())
+        )
+        AccessGrantDigestEntry.mark_failed(
+            entry_ids, fail_reason="Error while sending access grant digest email"
+        )
+        return False
+
+    AccessGrantDigestEntry.mark_sent(entry_ids)
+    logger.debug(
+        {
+            "digest": digest_key,
+            "status": "Sent",
+            "requestIds": [entry.user_access_mapping.request_id for entry in entries],
+        }
+    )
+
+    return True
+
+
+@shared_task
+def send_due_access_grant_digests():
+    """ Send the pending digests whose scheduled send was lost """
+    AccessGrantDigestEntry.release_expired_claims()
+    now = timezone.now()
+    for digest in AccessGrantDigestEntry.get_pending_digests():
+        access_module = helpers.get_available_access_module_from_tag(
+            digest["access_tag"]
+        )
+        window_seconds = access_module.digest_window_seconds if access_module else 0
+        due_on = digest["first_created_on"] + datetime.timedelta(
+            seconds=window_seconds + ACCESS_GRANT_DIGEST_SWEEP_GRACE_SECONDS
+        )
+        if due_on > now:
+            continue
+        try:
+            send_access_grant_digest(digest["digest_key"])
+        except Exception:
+            logger.exception("Digest %s could not be sent", digest["digest_key"])
+    return True
+
+
+def schedule_outbound_notifications(countdown=0):
+    if background_task_manager_type == "celery":
+        send_outbound_notifications.apply_async(countdown=countdown)
+    else:
+        outbound_notification_timer = threading.Timer(
+            countdown, send_outbound_notifications
+        )
+        outbound_notification_timer.start()
+
+
+@shared_task(
+    autoretry_for=(Exception,), retry_kwargs={"max_retries": 3, "countdown": 5}
+)
+def send_outbound_notifications():
+    outbound_notifications = OutboundNotification.claim_due_notifications(
+        OUTBOUND_NOTIFICATION_BATCH_SIZE
+    )
+    for outbound_notification in outbound_notifications:
+        try:
+            general.send_emails(
+                [
+                    general.email_message(
+                        outbound_notification.destination,
+                        outbound_notification.subject,
+                        outbound_notification.body,
+                    )
+                ]
+            )
+        except Exception as e:
+            logger.exception(
+                "Error while sending notification %s: %s",
+                outbound_notification.id,
+                str(e),
+            )
+            retry_in = outbound_notification.mark_attempt_failed(str(e))
+            if retry_in is not None:
+                schedule_outbound_notifications(retry_in)
+            continue
+        outbound_notification.mark_sent()
+
+    if (
+        len(outbound_notifications) == OUTBOUND_NOTIFICATION_BATCH_SIZE
+        and OutboundNotification.get_due_notifications().exists()
+    ):
+        schedule_outbound_notifications()
+    return True
+
+
 @task_success.connect(sender=run_access_grant)
 def task_success(sender=None, **kwargs):
     success_func()
@@ -327,3 +526,45 @@ def revoke_request(user_access_mapping, revoker=None):
     if result:
         return True
     return False
+
+
+def accept_requests(user_access_mappings):
+    """ Queue the grants of the mappings together once the transaction commits """
+    request_ids = [mapping.request_id for mapping in user_access_mappings]
+    if not request_ids:
+        return
+
+    def queue_grants():
+        try:
+            background_task("run_access_grant_batch", request_ids)
+        except Exception:
+            logger.exception("Grants could not be queued: %s", request_ids)
+            UserAccessMapping.objects.filter(request_id__in=request_ids).update(
+                status="GrantFailed", fail_reason="Task could not be queued"
+            )
+
+    transaction.on_commit(queue_grants)
+
+
+def revoke_requests(user_access_mappings, revoker=None):
+    """
+    Mark the mappings as revoke processing and queue their revokes together
+    once the transaction commits.
+    """
+    request_ids = [mapping.request_id for mapping in user_access_mappings]
+    if not request_ids:
+        return
+    UserAccessMapping.objects.filter(request_id__in=request_ids).update(
+        status="ProcessingRevoke", revoker=revoker
+    )
+
+    def queue_revokes():
+        try:
+            background_task("run_access_revoke_batch", request_ids)
+        except Exception:
+            logger.exception("Revokes could not be queued: %s", request_ids)
+            UserAccessMapping.objects.filter(request_id__in=request_ids).update(
+                status="RevokeFailed", fail_reason="Task could not be queued"
+            )
+
+    transaction.on_commit(queue_revokes)
@@ -1,10 +1,11 @@
 from django.shortcuts import render
+from django.template.loader import render_to_string
 import logging
 import traceback
 
-from Access.models import UserAccessMapping, GroupAccessMapping
+from Access.models import UserAccessMapping, GroupAccessMapping, AccessGrantDigestEntry
 from EnigmaAutomation.settings import ACCESS_APPROVE_EMAIL, PERMISSION_CONSTANTS
-from bootprocess.general import emailSES
+from bootprocess.general import emailSES, send_emails, email_message
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +16,10 @@ logger = logging.getLogger(__name__)
 class BaseEmailAccess(object):
     available = True
     group_access_allowed = True
+    # Set digest_mode in the module to collect the grants for the same
+    # email_targets into a single mail sent once per digest window
+    digest_mode = False
+    digest_window_seconds = 300
 
     def grant_owner(self):
         return [ACCESS_APPROVE_EMAIL]
@@ -121,13 +126,24 @@ class BaseEmailAccess(object):
         return user_pending_requests
 
     def approve(
-        self, user, labels, approver, requestId, is_group=False, auto_approve_rules=None
+        self,
+        user_identity,
+        labels,
+        approver,
+        request,
+        is_group=False,
+        auto_approve_rules=None,
     ):
+        user = user_identity.user
         try:
             label_desc = self.combine_labels_desc(labels)
             email_targets = self.email_targets(user)
+            if self.digest_mode:
+                self.__add_to_digest(email_targets, request, label_desc, approver)
+                return True, ""
+
             email_subject = "Approved Access: %s for access to %s for user %s" % (
-                requestId,
+                request.request_id,
                 self.access_desc(),
                 user.email,
             )
@@ -149,8 +165,10 @@ class BaseEmailAccess(object):
                     " by %s" % (label_desc, self.access_desc(), user.email, approver)
                 )
 
-                emailSES(email_targets, email_subject, email_body)
-                return True, ""
+            # approve runs in the background, the email is sent right away so
+            # that the request is marked GrantFailed if it can not be delivered
+            send_emails([email_message(email_targets, email_subject, email_body)])
+            return True, ""
         except Exception as e:
             logger.error(
                 "Could not send email for error %s", str(traceback.format_exc())
@@ -158,6 +176,32 @@ class BaseEmailAccess(object):
             logger.error(e)
             return False, str(traceback.format_exc())
 
+    def __add_to_digest(self, email_targets, request, label_desc, approver):
+        # imported here since access modules are loaded while
+        # the background task manager is still being imported
+        from Access.background_task_manager import schedule_access_grant_digest
+
+        digest_key, is_first_entry = AccessGrantDigestEntry.add(
+            access_tag=self.tag(),
+            email_targets=email_targets,
+            user_access_mapping=request,
+            label_desc=label_desc,
+            approver=approver,
+        )
+        if is_first_entry:
+            schedule_access_grant_digest(digest_key, self.digest_window_seconds)
+
+    def send_digest(self, email_targets, entries):
+        email_subject = "Approved Accesses: %s grants for access to %s" % (
+            len(entries),
+            self.access_desc(),
+        )
+        email_body = render_to_string(
+            "accessGrantDigestEmail.html",
+            {"accessDesc": self.access_desc(), "entries": entries},
+        )
+        send_emails([email_message(email_targets, email_subject, email_body)])
+
     def revoke(self, user, label):
         label_desc = self.get_label_desc(label)
 
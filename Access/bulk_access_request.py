@@ -0,0 +1,207 @@
+""" Access requests of many users at once, for onboarding cohorts """
+import datetime
+import logging
+import uuid
+
+from Access import helpers
+from Access.accessrequest_helper import create_access_requests
+from Access.background_task_manager import accept_requests
+from Access.models import User, UserAccessMapping
+
+logger = logging.getLogger(__name__)
+
+BULK_ACCESS_REQUEST_MAX_ITEMS = 1000
+
+BULK_ACCESS_REQUEST_INVALID_ITEM_MSG = (
+    "Each request needs an email, an accessTag, a non empty accessLabels list"
+    " and a reason"
+)
+BULK_ACCESS_REQUEST_TOO_MANY_ITEMS_MSG = (
+    "At most {max_items} requests can be submitted at once"
+)
+BULK_ACCESS_REQUEST_USER_NOT_FOUND_MSG = "User {email} not found"
+BULK_ACCESS_REQUEST_MODULE_NOT_FOUND_MSG = "Access module {access_tag} not found"
+
+
+class BulkAccessRequestException(Exception):
+    pass
+
+
+def validate_bulk_access_requests(items):
+    """ Raise if the payload can not be processed at all """
+    if not isinstance(items, list):
+        raise BulkAccessRequestException("requests must be a list")
+    if len(items) > BULK_ACCESS_REQUEST_MAX_ITEMS:
+        raise BulkAccessRequestException(
+            BULK_ACCESS_REQUEST_TOO_MANY_ITEMS_MSG.format(
+                max_items=BULK_ACCESS_REQUEST_MAX_ITEMS
+            )
+        )
+
+
+def _is_valid_item(item):
+    return (
+        isinstance(item, dict)
+        and isinstance(item.get("email"), str)
+        and isinstance(item.get("accessTag"), str)
+        and isinstance(item.get("accessLabels"), list)
+        and len(item["accessLabels"]) > 0
+        and isinstance(item.get("reason"), str)
+        and item["reason"].strip() != ""
+    )
+
+
+def _item_report(index, item, status, msg, request_ids=None):
+    report = {
+        "index": index,
+        "email": item.get("email") if isinstance(item, dict) else None,
+        "accessTag": item.get("accessTag") if isinstance(item, dict) else None,
+        "status": status,
+        "msg": msg,
+    }
+    if request_ids is not None:
+        report["requestIds"] = request_ids
+    return report
+
+
+def create_bulk_access_requests(requester, items, auto_approve=False):
+    """Request accesses for many users and report on every item.
+
+    Items are dicts of "email", "accessTag", "accessLabels" and "reason".
+    Every item is validated through its module, then the mappings of all the
+    valid items are created together. With auto_approve, requests of modules
+    which can auto approve are granted with the requester as the approver.
+
+    Runs to completion before returning, so callers streaming the reports
+    can not leave valid items uninserted. Returns the reports of all the
+    items, in input order, each with the index of its item.
+    """
+    validate_bulk_access_requests(items)
+    users = {
+        user.email: user
+        for user in User.get_users_by_emails(
+            {item["email"] for item in items if _is_valid_item(item)}
+        )
+    }
+    date_time = datetime.datetime.utcnow().strftime("%Y%m%d%H%M%S")
+
+    reports = []
+    access_requests = []
+    for index, item in enumerate(items):
+        if not _is_valid_item(item):
+            reports.append(
+                _item_report(
+                    index, item, "error", BULK_ACCESS_REQUEST_INVALID_ITEM_MSG
+                )
+            )
+            continue
+        user = users.get(item["email"])
+        if not user:
+            reports.append(
+                _item_report(
+                    index,
+                    item,
+                    "error",
+                    BULK_ACCESS_REQUEST_USER_NOT_FOUND_MSG.format(
+                        email=item["email"]
+                    ),
+                )
+            )
+            continue
+        access_module = helpers.get_available_access_module_from_tag(
+            item["accessTag"]
+        )
+        if not access_module:
+            reports.append(
+                _item_report(
+                    index,
+                    item,
+                    "error",
+                    BULK_ACCESS_REQUEST_MODULE_NOT_FOUND_MSG.format(
+                        access_tag=item["accessTag"]
+                    ),
+                )
+            )
+            continue
+        try:
+            module_access_labels = access_module.validate_request(
+                item["accessLabels"], user.user, is_group=False
+            )
+        except Exception as e:
+            logger.exception("Invalid bulk access request %s: %s", index, e)
+            reports.append(_item_report(index, item, "error", str(e)))
+            continue
+
+        is_auto_approved = auto_approve and access_module.can_auto_approve()
+        # the random part keeps ids unique across bulk submissions
+        request_id = "%s-%s-%s-%s" % (
+            user.user.username, item["accessTag"], date_time, uuid.uuid4().hex[:8]
+        )
+        for label_index, access_label in enumerate(module_access_labels):
+            access_request = {
+                "index": index,
+                "user": user,
+                "access_tag": item["accessTag"],
+                "access_label": access_label,
+                "request_id": "%s_%s" % (request_id, label_index),
+                "access_reason": item["reason"],
+            }
+            if is_auto_approved:
+                access_request["status"] = "Processing"
+                access_request["approver_1"] = requester
+            access_requests.append(access_request)
+
+    if not access_requests:
+        return reports
+
+    access_create_errors = create_access_requests(access_requests)
+
+    auto_approved_request_ids = [
+        access_request["request_id"]
+        for access_request, access_create_error in zip(
+            access_requests, access_create_errors
+        )
+        if access_create_error["title"] == "success"
+        and access_request.get("status") == "Processing"
+    ]
+    if auto_approved_request_ids:
+        accept_requests(
+            UserAccessMapping.objects.filter(request_id__in=auto_approved_request_ids)
+        )
+
+    item_results = {}
+    for access_request, access_create_error in zip(
+        access_requests, access_create_errors
+    ):
+        item_result = item_results.setdefault(
+            access_request["index"],
+            {
+                "requestIds": [],
+                "errors": [],
+                "autoApproved": access_request.get("status") == "Processing",
+            },
+        )
+        if access_create_error["title"] == "success":
+            item_result["requestIds"].append(access_request["request_id"])
+        else:
+            item_result["errors"].append(access_create_error["msg"])
+
+    for index, item_result in item_results.items():
+        if item_result["errors"]:
+            status = "partial" if item_result["requestIds"] else "error"
+            msg = "; ".join(item_result["errors"])
+        elif item_result["autoApproved"]:
+            status, msg = "approved", "Request approved, grant in progress"
+        else:
+            status, msg = "pending", "Request submitted for approval"
+        reports.append(
+            _item_report(
+                index,
+                items[index],
+                status,
+                msg,
+                request_ids=item_result["requestIds"],
+            )
+        )
+
+    return sorted(reports, key=lambda report: report["index"])
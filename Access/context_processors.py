@@ -1,35 +1,273 @@
 import datetime
 
-from Access.models import User
-from Access.helpers import get_available_access_modules, getPossibleApproverPermissions
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils.functional import SimpleLazyObject
+
+from Access.models import (
+    User,
+    Role,
+    Permission,
+    UserAccessMapping,
+    GroupAccessMapping,
+    MembershipV2,
+    GroupV2,
+)
+from Access.helpers import (
+    get_available_access_module_from_tag,
+    get_available_access_modules,
+    getPossibleApproverPermissions,
+)
+from EnigmaAutomation.settings import PERMISSION_CONSTANTS
+
+CONTEXT_CACHE_TTL_SECONDS = 60
+CONTEXT_CACHE_PREFIX = "context_data"
+
+# Cached values are invalidated when any of their dependencies change:
+# "permissions" on role and permission changes, "failures" on access request
+# changes, "groups" on group changes and "user" when the user itself, or one
+# of its memberships, is saved. "pendingCount" also depends on the "approver"
+# generation of each permission of the user, bumped for the approver
+# permissions of a changed request, and on "requests" bumped when those
+# permissions can not be found.
+CONTEXT_VALUE_DEPENDENCIES = {
+    "anyApprover": ["permissions", "user"],
+    "permissionLabels": ["permissions", "user"],
+    "pendingCount": ["permissions", "user", "requests"],
+    "grantFailureCount": ["failures", "user"],
+    "revokeFailureCount": ["failures", "user"],
+    "groups": ["groups", "user"],
+}
 
 
 def add_variables_to_context(request):
     # Skip adding context variables in case of API request
-    if request.headers["Content-Type"] == "application/json":
+    if request.headers.get("Content-Type") == "application/json":
         return {}
-
-    try:
-        currentUser = User.objects.get(user__username=request.user)
-    except User.DoesNotExist:
+    if not request.user.is_authenticated:
         return {}
 
-    all_access_modules = get_available_access_modules()
+    current_user = SimpleLazyObject(lambda: _get_current_user(request))
+    user_context_cache = UserContextCache(current_user)
 
+    # values are computed only when a template reads them
     context = {}
     context["currentYear"] = datetime.datetime.now().year
-    context["users"] = User.objects.filter().only("user")
-    context["anyApprover"] = currentUser.isAnApprover(getPossibleApproverPermissions())
-    context["is_ops"] = currentUser.is_ops
-    context["access_list"] = [
+    context["is_ops"] = SimpleLazyObject(
+        lambda: bool(current_user and current_user.is_ops)
+    )
+    context["access_list"] = SimpleLazyObject(_get_access_list)
+    context["anyApprover"] = _lazy_cached_value(
+        user_context_cache,
+        "anyApprover",
+        lambda: current_user.isAnApprover(getPossibleApproverPermissions()),
+        False,
+    )
+    context["pendingCount"] = _lazy_cached_value(
+        user_context_cache,
+        "pendingCount",
+        lambda: current_user.getPendingApprovalsCount(
+            get_available_access_modules()
+        ),
+        0,
+    )
+    context["grantFailureCount"] = _lazy_cached_value(
+        user_context_cache,
+        "grantFailureCount",
+        lambda: current_user.getFailedGrantsCount(),
+        0,
+    )
+    context["revokeFailureCount"] = _lazy_cached_value(
+        user_context_cache,
+        "revokeFailureCount",
+        lambda: current_user.getFailedRevokesCount(),
+        0,
+    )
+    context["groups"] = _lazy_cached_value(
+        user_context_cache,
+        "groups",
+        lambda: sorted([group.name for group in current_user.getOwnedGroups()]),
+        [],
+    )
+
+    return context
+
+
+def _get_current_user(request):
+    try:
+        return request.user.user
+    except User.DoesNotExist:
+        return None
+
+
+def _get_access_list():
+    return [
         {"tag": each_tag, "desc": each_module.access_desc()}
-        for each_tag, each_module in all_access_modules.items()
+        for each_tag, each_module in get_available_access_modules().items()
     ]
 
-    context["pendingCount"] = currentUser.getPendingApprovalsCount(all_access_modules)
-    context["grantFailureCount"] = currentUser.getFailedGrantsCount()
-    context["revokeFailureCount"] = currentUser.getFailedRevokesCount()
 
-    context["groups"] = sorted([group.name for group in currentUser.getOwnedGroups()])
+def _lazy_cached_value(user_context_cache, name, compute, default):
+    def get_value():
+        if not user_context_cache.current_user:
+            return default
+        return user_context_cache.get(name, compute)
 
-    return context
+    return SimpleLazyObject(get_value)
+
+
+class UserContextCache:
+    """
+    Context values of a user cached across requests and processes. The
+    generations of the dependencies and the cached values are each read with
+    one get_many on the first value read of the request.
+    """
+
+    def __init__(self, current_user):
+        self.current_user = current_user
+        self._generation_keys = None
+        self._generations = {}
+        self._values = {}
+
+    def _load(self):
+        user_id = self.current_user.id
+        self._generation_keys = {
+            name: [
+                _get_generation_key(dependency, user_id)
+                for dependency in dependencies
+            ]
+            for name, dependencies in CONTEXT_VALUE_DEPENDENCIES.items()
+        }
+        self._generations = cache.get_many(
+            {key for keys in self._generation_keys.values() for key in keys}
+        )
+        self._values = cache.get_many(
+            [
+                self._get_cache_key(name, keys)
+                for name, keys in self._generation_keys.items()
+            ]
+        )
+
+    def _get_cache_key(self, name, generation_keys):
+        return _get_cache_key(
+            self.current_user.id, name, generation_keys, self._generations
+        )
+
+    def get(self, name, compute):
+        if self._generation_keys is None:
+            self._load()
+        generation_keys = self._generation_keys[name]
+        if name == "pendingCount":
+            # only the approvers of a changed request get a stale count
+            approver_keys = [
+                _get_generation_key("approver", permission_label)
+                for permission_label in self.get(
+                    "permissionLabels", self._get_permission_labels
+                )
+            ]
+            self._generations.update(cache.get_many(approver_keys))
+            generation_keys = generation_keys + approver_keys
+            self._values.update(
+                cache.get_many([self._get_cache_key(name, generation_keys)])
+            )
+        cache_key = self._get_cache_key(name, generation_keys)
+        value = self._values.get(cache_key)
+        if value is None:
+            value = compute()
+            cache.set(cache_key, value, CONTEXT_CACHE_TTL_SECONDS)
+            self._values[cache_key] = value
+        return value
+
+    def _get_permission_labels(self):
+        return sorted(
+            {permission.label for permission in self.current_user.permissions}
+        )
+
+
+def _get_generation_key(dependency, scope=None):
+    if dependency in ["user", "approver"]:
+        return "%s:generation:%s:%s" % (CONTEXT_CACHE_PREFIX, dependency, scope)
+    return "%s:generation:%s" % (CONTEXT_CACHE_PREFIX, dependency)
+
+
+def _get_cache_key(user_id, name, generation_keys, generations):
+    return "%s:%s:%s:%s" % (
+        CONTEXT_CACHE_PREFIX,
+        user_id,
+        name,
+        ":".join(str(generations.get(key, 0)) for key in generation_keys),
+    )
+
+
+def invalidate_context_data(dependency, scope=None):
+    """ Make cached context values depending on the dependency stale """
+    generation_key = _get_generation_key(dependency, scope)
+    try:
+        cache.incr(generation_key)
+    except ValueError:
+        cache.set(generation_key, 1, None)
+
+
+def invalidate_pending_requests_context_data(access):
+    """ Make the pending counts of the approvers of the access stale """
+    try:
+        access_module = get_available_access_module_from_tag(access.access_tag)
+        approver_permissions = access_module.fetch_approver_permissions(
+            access.access_label
+        )
+        permission_labels = set(approver_permissions.values())
+    except Exception:
+        # approvers are unknown, every pending count is made stale
+        invalidate_context_data("requests")
+        return
+    for permission_label in permission_labels:
+        invalidate_context_data("approver", permission_label)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_context_data(sender, instance, **kwargs):
+    invalidate_context_data("user", instance.id)
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+@receiver(m2m_changed, sender=User.role.through)
+@receiver(m2m_changed, sender=Role.permission.through)
+def invalidate_permissions_context_data(sender, **kwargs):
+    invalidate_context_data("permissions")
+
+
+@receiver(post_save, sender=UserAccessMapping)
+@receiver(post_delete, sender=UserAccessMapping)
+def invalidate_access_request_context_data(sender, instance, **kwargs):
+    invalidate_context_data("failures")
+    invalidate_pending_requests_context_data(instance.access)
+
+
+@receiver(post_save, sender=GroupAccessMapping)
+@receiver(post_delete, sender=GroupAccessMapping)
+def invalidate_group_access_request_context_data(sender, instance, **kwargs):
+    invalidate_pending_requests_context_data(instance.access)
+
+
+@receiver(post_save, sender=MembershipV2)
+@receiver(post_delete, sender=MembershipV2)
+def invalidate_membership_context_data(sender, instance, **kwargs):
+    # pending memberships are approved with the default approver permission
+    invalidate_context_data(
+        "approver", PERMISSION_CONSTANTS["DEFAULT_APPROVER_PERMISSION"]
+    )
+    invalidate_context_data("user", instance.user_id)
+
+
+@receiver(post_save, sender=GroupV2)
+@receiver(post_delete, sender=GroupV2)
+def invalidate_group_context_data(sender, **kwargs):
+    invalidate_context_data(
+        "approver", PERMISSION_CONSTANTS["DEFAULT_APPROVER_PERMISSION"]
+    )
+    invalidate_context_data("groups")
@@ -0,0 +1,136 @@
+""" Data of the group access list page, cached per group until the group changes """
+import json
+import logging
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Exists, OuterRef
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from Access import helpers
+from Access.models import (
+    GroupAccessMapping,
+    GroupV2,
+    MembershipV2,
+    Permission,
+    User,
+)
+
+logger = logging.getLogger(__name__)
+
+GROUP_ACCESS_LIST_CACHE_TTL_SECONDS = 300
+GROUP_ACCESS_LIST_CACHE_PREFIX = "group_access_list"
+# fields of the members shown on the page
+GROUP_ACCESS_LIST_USER_FIELDS = {"name", "email", "state"}
+
+
+def get_group_with_user_permissions(group_name, user):
+    """Active group by name, with the user's owner and offboard rights on it.
+
+    The group and both rights are read in one query. Returns None when the
+    group does not exist.
+    """
+    return (
+        GroupV2.objects.filter(name=group_name, status="Approved")
+        .annotate(
+            user_is_owner=Exists(
+                MembershipV2.objects.filter(
+                    group=OuterRef("pk"), user=user, status="Approved", is_owner=True
+                )
+            ),
+            user_can_offboard=Exists(
+                Permission.objects.filter(role__user=user, label="ALLOW_USER_OFFBOARD")
+            ),
+        )
+        .first()
+    )
+
+
+def get_group_members(group):
+    user_states = dict(User.USER_STATUS_CHOICES)
+    return [
+        {
+            "name": member["user__name"],
+            "email": member["user__email"],
+            "is_owner": member["is_owner"],
+            "current_state": user_states.get(member["user__state"]),
+            "membership_id": member["membership_id"],
+        }
+        for member in group.get_all_approved_members().values(
+            "membership_id", "is_owner", "user__name", "user__email", "user__state"
+        )
+    ]
+
+
+def get_group_generic_accesses(group):
+    """Details of the group's access mappings, one module lookup per access tag"""
+    group_mappings = group.get_active_accesses().select_related(
+        "access", "group", "requested_by"
+    )
+    access_modules = {}
+    generic_accesses = []
+    for group_mapping in group_mappings:
+        access_tag = group_mapping.access.access_tag
+        if access_tag not in access_modules:
+            access_modules[access_tag] = helpers.get_available_access_module_from_tag(
+                access_tag
+            )
+        if not access_modules[access_tag]:
+            continue
+        generic_accesses.append(
+            group_mapping.getAccessRequestDetails(access_modules[access_tag])
+        )
+    return generic_accesses
+
+
+def _get_version_key(group_id):
+    return "%s:version:%s" % (GROUP_ACCESS_LIST_CACHE_PREFIX, group_id)
+
+
+def get_group_access_list_json(group):
+    """Members and accesses of the group as JSON, cached until the group changes"""
+    version = cache.get(_get_version_key(group.id), 0)
+    cache_key = "%s:%s:%s" % (GROUP_ACCESS_LIST_CACHE_PREFIX, group.id, version)
+    group_access_list = cache.get(cache_key)
+    if group_access_list is None:
+        group_access_list = json.dumps(
+            {
+                "userList": get_group_members(group),
+                "genericAccesses": get_group_generic_accesses(group),
+            },
+            cls=DjangoJSONEncoder,
+        )
+        cache.set(cache_key, group_access_list, GROUP_ACCESS_LIST_CACHE_TTL_SECONDS)
+    return group_access_list
+
+
+def invalidate_group_access_list(group_id):
+    """ Make the cached access list of the group stale """
+    version_key = _get_version_key(group_id)
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        cache.set(version_key, 1, None)
+
+
+@receiver(post_save, sender=MembershipV2)
+@receiver(post_delete, sender=MembershipV2)
+@receiver(post_save, sender=GroupAccessMapping)
+@receiver(post_delete, sender=GroupAccessMapping)
+def invalidate_group_access_list_on_change(sender, instance, **kwargs):
+    invalidate_group_access_list(instance.group_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_group_access_lists_of_user(
+    sender, instance, created, update_fields=None, **kwargs
+):
+    # a new user has no memberships, and only the displayed fields are cached
+    if created or (
+        update_fields is not None
+        and not GROUP_ACCESS_LIST_USER_FIELDS.intersection(update_fields)
+    ):
+        return
+    for group_id in instance.membership_user.values_list("group_id", flat=True):
+        invalidate_group_access_list(group_id)
@@ -1,12 +1,29 @@
-from Access.models import GroupAccessMapping, User, GroupV2, MembershipV2, AccessV2
-from Access import helpers, views_helper, notifications, accessrequest_helper
+from Access.models import (
+    GroupAccessMapping,
+    User,
+    GroupV2,
+    MembershipV2,
+    AccessV2,
+    UserAccessMapping,
+)
+from Access import (
+    views_helper,
+    notifications,
+    accessrequest_helper,
+    group_access_list,
+)
 from django.db import transaction
+from django.utils import timezone
 import datetime
 import logging
 from Access.views_helper import execute_group_access
-from EnigmaAutomation.settings import MAIL_APPROVER_GROUPS, PERMISSION_CONSTANTS
+from EnigmaAutomation.settings import (
+    DEFAULT_ACCESS_GROUP,
+    MAIL_APPROVER_GROUPS,
+    PERMISSION_CONSTANTS,
+)
 from . import helpers as helper
-from Access.background_task_manager import revoke_request
+from Access.background_task_manager import background_task, revoke_requests
 import json
 
 logger = logging.getLogger(__name__)
@@ -27,6 +44,9 @@ INTERNAL_ERROR_MESSAGE = {
 USER_UNAUTHORIZED_MESSAGE = "User unauthorised to perform the action."
 GROUP_ACCESS_MAPPING_NOT_FOUND = "Group Access Mapping not found in the database."
 
+NON_APPROVED_STATUSES = ["Pending", "SecondaryPending", "GrantFailed"]
+GRANTED_STATUSES = ["Approved", "Processing", "Offboarding"]
+
 NEW_GROUP_CREATE_ERROR_GROUP_EXISTS = {
     "error_msg": "Invalid Group Name",
     "msg": "A group with name {group_name} already exists. Please choose a new name.",
@@ -146,8 +166,9 @@ def create_group(request):
     if "selectedUserList" in data:
         initial_members = list(map(str, selected_users))
         new_group.add_members(
-            users=User.objects.filter(email__in=initial_members),
+            users=User.get_users_by_emails(initial_members),
             requested_by=request.user.user,
+            date_time=base_datetime_prefix,
         )
     else:
         initial_members = [request.user.email]
@@ -166,22 +187,11 @@ def create_group(request):
     return context
 
 
-def get_generic_access(group_mapping):
-    access_details = {}
-    access_module = helpers.get_available_access_module_from_tag(
-        group_mapping.access.access_tag
-    )
-    if not access_module:
-        return {}
-
-    access_details = group_mapping.getAccessRequestDetails(access_module)
-    logger.debug("Generic access generated: " + str(access_details))
-    return access_details
-
-
 def get_group_access_list(auth_user, group_name):
     context = {}
-    group = GroupV2.get_active_group_by_name(group_name)
+    group = group_access_list.get_group_with_user_permissions(
+        group_name, auth_user.user
+    )
     if not group:
         logger.debug(f"Group does not exist with group name {group_name}")
         context = {
@@ -194,8 +204,7 @@ def get_group_access_list(auth_user, group_name):
         }
         return context
 
-    auth_user = auth_user
-    if not auth_user.user.is_allowed_admin_actions_on_group(group):
+    if not (group.user_is_owner or auth_user.user.isAdminOrOps()):
         logger.debug("Permission denied, requester is non owner")
         context = {
             "error": {
@@ -205,31 +214,11 @@ def get_group_access_list(auth_user, group_name):
         }
         return context
 
-    group_members = group.get_all_members().filter(status="Approved")
-    group_members = [
-        {
-            "name": member.user.name,
-            "email": member.user.email,
-            "is_owner": member.is_owner,
-            "current_state": member.user.current_state(),
-            "membership_id": member.membership_id,
-        }
-        for member in group_members
-    ]
-    context["userList"] = group_members
+    context.update(
+        json.loads(group_access_list.get_group_access_list_json(group))
+    )
     context["groupName"] = group_name
-
-    allow_revoke = False
-    if auth_user.user.is_allowed_to_offboard_user_from_group(group):
-        allow_revoke = True
-    context["allowRevoke"] = allow_revoke
-
-    group_mappings = group.get_active_accesses()
-    context["genericAccesses"] = [
-        get_generic_access(group_mapping) for group_mapping in group_mappings
-    ]
-    if context["genericAccesses"] == [{}]:
-        context["genericAccesses"] = []
+    context["allowRevoke"] = group.user_is_owner or group.user_can_offboard
 
     return context
 
@@ -264,21 +253,29 @@ def update_owners(request, group_name):
         data["owners"] = []
 
     auth_user = request.user
-    destination = [auth_user.user.email]
-
     group_members = group.get_all_approved_members().exclude(user=auth_user.user)
 
     # we will only get data["owners"] as owners who are checked in UI
     # (exluding disabled checkbox owner who requested the change)
     with transaction.atomic():
-        for membership in group_members:
-            if membership.user.email in data["owners"]:
-                membership.is_owner = True
-                destination.append(membership.user.email)
-            else:
-                membership.is_owner = False
-            membership.save()
+        added_owners_count = group_members.filter(
+            is_owner=False, user__email__in=data["owners"]
+        ).update(is_owner=True, updated_on=timezone.now())
+        removed_owners_count = group_members.filter(is_owner=True).exclude(
+            user__email__in=data["owners"]
+        ).update(is_owner=False, updated_on=timezone.now())
+    # bulk updates do not send the signals which invalidate the cached page
+    group_access_list.invalidate_group_access_list(group.id)
+
+    if not (added_owners_count or removed_owners_count):
+        logger.debug("Owners of group " + group.name + " are unchanged")
+        context["notification"] = "Owner's unchanged"
+        return context
 
+    destination = [auth_user.user.email]
+    destination.extend(
+        group_members.filter(is_owner=True).values_list("user__email", flat=True)
+    )
     logger.debug("Owners changed to " + ", ".join(destination))
     destination.extend(MAIL_APPROVER_GROUPS)
     notifications.send_group_owners_update_mail(
@@ -328,6 +325,9 @@ def approve_new_group_request(auth_user, group_id):
             with transaction.atomic():
                 group.approve(approved_by=auth_user.user)
                 group.approve_all_pending_users(approved_by=auth_user.user)
+            if group.name == DEFAULT_ACCESS_GROUP:
+                # users created before the default group are enrolled now
+                background_task("run_default_group_backfill")
             initial_members = group.get_all_members()
             initial_member_names = [user.user.name for user in initial_members]
             try:
@@ -423,40 +423,35 @@ def add_user_to_group(request):
             }
             return context
 
-        duplicate_request_emails = _check_if_members_in_group(
-            group=group, selected_members=data["selectedUserList"]
-        )
+        selected_users = get_selected_users_by_email(data["selectedUserList"])
 
-        if duplicate_request_emails:
+        # users already approved or pending, including concurrently added
+        # ones, are skipped by add_members
+        memberships, skipped_users = group.add_members(
+            users=selected_users,
+            requested_by=request.user.user,
+            reason=data["memberReason"][0],
+            date_time=base_datetime_prefix,
+        )
+        duplicate_request_emails = [user.email for user in skipped_users]
+        if duplicate_request_emails and not memberships:
             context = {}
             msg = DUPLICATE_GROUP_MEMBER_ADD_REQUEST.format(
-                user_emails=duplicate_request_emails
+                user_emails=",".join(duplicate_request_emails)
             )
             context["error"] = {"error_msg": "Duplicate Request", "msg": msg}
             return context
 
-        selected_users = get_selected_users_by_email(data["selectedUserList"])
-
-        users_added = {}
-        user_not_added = []
-        for user in selected_users:
-            try:
-                with transaction.atomic():
-                    membership = group.add_member(
-                        user=user,
-                        requested_by=request.user.user,
-                        reason=data["memberReason"][0],
-                        date_time=base_datetime_prefix,
-                    )
-                    membership_id = membership.membership_id
-                    if not group.needsAccessApprove:
-                        context = {}
-                        context["accessStatus"] = {
-                            "msg": REQUEST_PROCESSING.format(requestId=membership_id),
-                            "desc": (
-                                "A email will be sent after the requested access are granted"
-                            ),
-                        }
+        users_added = {
+            membership.user.email: membership.membership_id
+            for membership in memberships
+        }
+        user_not_added = list(duplicate_request_emails)
+        if not group.needsAccessApprove:
+            failed_memberships = []
+            for membership in memberships:
+                try:
+                    with transaction.atomic():
                         user_mappings_list = views_helper.generate_user_mappings(
                             membership.user, group, membership
                         )
@@ -466,54 +461,53 @@ def add_user_to_group(request):
                         )
                         logger.debug(
                             "Process has been started for the Approval of request - "
-                            + membership_id
+                            + membership.membership_id
                             + " - Approver="
                             + request.user.username
                         )
-                    users_added[user.email] = membership_id
-            except Exception as e:
-                logger.debug(
-                    "Error adding User: %s could not be added to the group, Exception: %s ",
-                    user.email,
-                    str(e),
-                )
-                user_not_added.append(user.email)
+                except Exception as e:
+                    logger.debug(
+                        "Error adding User: %s could not be added to the group, Exception: %s ",
+                        membership.user.email,
+                        str(e),
+                    )
+                    failed_memberships.append(membership.id)
+                    users_added.pop(membership.user.email)
+                    user_not_added.append(membership.user.email)
+            # users who could not be added are not left as pending members
+            MembershipV2.objects.filter(id__in=failed_memberships).delete()
+
         if group.needsAccessApprove:
             notifications.send_mail_for_member_approval(
-                ",".join(user_not_added),
+                ",".join(users_added),
                 str(request.user),
                 data["groupName"][0],
                 data["memberReason"][0],
             )
-            context = {}
-            context["status"] = {
-                "title": ADD_MEMBER_REQUEST_SUBMITTED_MESSAGE["title"],
-                "msg": ADD_MEMBER_REQUEST_SUBMITTED_MESSAGE["msg"],
-            }
-
-        else:
-            membership = MembershipV2.get_membership(membership_id=membership_id)
+        elif users_added:
+            membership = MembershipV2.get_membership(
+                membership_id=list(users_added.values())[-1]
+            )
             notifications.send_mulitple_membership_accepted_notification(
                 users_added,
                 data["groupName"][0],
                 membership,
             )
-            if len(selected_users) - len(users_added) == 0:
-                context = {}
-                context["status"] = {
-                    "title": ADD_MEMBER_REQUEST_SUBMITTED_MESSAGE["title"],
-                    "msg": ADD_MEMBER_REQUEST_SUBMITTED_MESSAGE["msg"],
-                }
-            else:
-                context = {}
-                context["status"] = {
-                    "title": ALL_USERS_NOT_ADDED["title"],
-                    "msg": ALL_USERS_NOT_ADDED["msg"].format(
-                        user_not_added=",".join(user_not_added),
-                        users_added=",".join(users_added),
-                    ),
-                }
 
+        context = {}
+        if not user_not_added:
+            context["status"] = {
+                "title": ADD_MEMBER_REQUEST_SUBMITTED_MESSAGE["title"],
+                "msg": ADD_MEMBER_REQUEST_SUBMITTED_MESSAGE["msg"],
+            }
+        else:
+            context["status"] = {
+                "title": ALL_USERS_NOT_ADDED["title"],
+                "msg": ALL_USERS_NOT_ADDED["msg"].format(
+                    users_not_added=",".join(user_not_added),
+                    users_added=",".join(users_added),
+                ),
+            }
         return context
     except Exception as e:
         logger.exception(e)
@@ -526,22 +520,6 @@ def add_user_to_group(request):
         return context
 
 
-def _check_if_members_in_group(group, selected_members):
-    group_members_email = group.get_approved_and_pending_member_emails()
-    duplicate_request_emails = set(selected_members).intersection(
-        set(group_members_email)
-    )
-    return duplicate_request_emails
-
-
-def _check_if_members_in_group(group, selected_members):
-    group_members_email = group.get_approved_and_pending_member_emails()
-    duplicate_request_emails = set(selected_members).intersection(
-        set(group_members_email)
-    )
-    return duplicate_request_emails
-
-
 def is_user_in_group(user_email, group_members_email):
     return user_email in group_members_email
 
@@ -750,14 +728,6 @@ def validate_group_access_create_request(group, auth_user):
     return None
 
 
-def revoke_user_access(user, access, revoker, decline_message):
-    user_identity = user.get_active_identity(access.access_tag)
-    user_identity.decline_non_approved_access_mapping(access, decline_message)
-    access_mapping = user_identity.get_granted_access_mapping(access).first()
-    if not access_mapping:
-        return False
-    revoke_request(access_mapping, revoker)
-
 def remove_member(request, auth_user):
     try:
         membership_id = request.POST.get("membershipId")
@@ -773,43 +743,96 @@ def remove_member(request, auth_user):
         logger.exception(str(e))
         return {"error": ERROR_MESSAGE}
 
-    user = membership.user
+    # selected first, MySQL can not update a table it reads in a subquery
+    user_access_mappings = list(
+        get_user_access_mappings_only_through_group(membership.user, membership.group)
+        .filter(status__in=NON_APPROVED_STATUSES + GRANTED_STATUSES)
+        .only("id", "request_id", "status")
+    )
+    with transaction.atomic():
+        decline_and_revoke_user_access_mappings(
+            user_access_mappings, request.user.user, "User removed from the group"
+        )
+        membership.revoke_membership()
+
+    return {"message": "Successfully removed user from group"}
 
-    group_accesses = [
-        mapping.access for mapping in membership.group.get_approved_accesses()
-    ]
 
-    other_memberships_groups = (
-        user.get_all_approved_memberships()
-        .exclude(group=membership.group)
-        .values_list("group", flat=True)
+def decline_and_revoke_user_access_mappings(
+    user_access_mappings, revoker, decline_reason
+):
+    """Decline the mappings not yet granted and queue revokes for the rest."""
+    UserAccessMapping.objects.filter(
+        id__in=[
+            mapping.id
+            for mapping in user_access_mappings
+            if mapping.status in NON_APPROVED_STATUSES
+        ]
+    ).update(status="Declined", decline_reason=decline_reason)
+    revoke_requests(
+        [
+            mapping
+            for mapping in user_access_mappings
+            if mapping.status in GRANTED_STATUSES
+        ],
+        revoker,
     )
-    other_group_accesses = []
 
-    for group in other_memberships_groups:
-        mapping = group.get_approved_accesses()
-        other_group_accesses.append(mapping.access)
 
-    accesses = list(set(group_accesses) - set(other_group_accesses))
+def get_user_access_mappings_only_through_group(user, group):
+    """Access mappings of the user which only the group gives them.
 
-    with transaction.atomic():
-        for access in accesses:
-            revoke_user_access(user, access, request.user.user, "User removed from the group")
+    Accesses of the group, minus those of the user's other approved groups,
+    minus accesses granted to the user individually. The result is a single
+    query.
+    """
+    group_accesses = group.get_approved_accesses().values("access")
+    other_group_accesses = (
+        GroupAccessMapping.objects.filter(
+            status="Approved",
+            group__membership_group__user=user,
+            group__membership_group__status="Approved",
+        )
+        .exclude(group=group)
+        .values("access")
+    )
+    individual_accesses = UserAccessMapping.objects.filter(
+        user_identity__user=user,
+        access_type="Individual",
+        status__in=GRANTED_STATUSES,
+    ).values("access")
+    return (
+        UserAccessMapping.objects.filter(
+            user_identity__user=user,
+            user_identity__status="Active",
+            access__in=group_accesses,
+        )
+        .exclude(access__in=other_group_accesses)
+        .exclude(access__in=individual_accesses)
+    )
 
-    membership.revoke_membership()
 
-    return {"message": "Successfully removed user from group"}
+def get_member_access_mappings_not_in_other_groups(group, access):
+    """Access mappings of the group's members for an access they only get from it.
 
-def access_exist_in_other_groups_of_user(membership, group, access):
-    other_memberships = (
-        membership.user.get_all_approved_memberships()
-        .exclude(group=membership.group)
+    Members who get the access from another approved group keep it. The
+    result is a single query.
+    """
+    members_with_access_in_other_groups = (
+        MembershipV2.objects.filter(
+            status="Approved",
+            group__group_access_mapping__access=access,
+            group__group_access_mapping__status="Approved",
+        )
+        .exclude(group=group)
+        .values("user")
     )
-    for membership in other_memberships:
-        if membership.group.check_access_exist(access):
-            return True
-
-    return False
+    return UserAccessMapping.objects.filter(
+        access=access,
+        user_identity__status="Active",
+        user_identity__access_tag=access.access_tag,
+        user_identity__user__in=group.get_all_approved_members().values("user"),
+    ).exclude(user_identity__user__in=members_with_access_in_other_groups)
 
 
 def revoke_access_from_group(request):
@@ -832,17 +855,16 @@ def revoke_access_from_group(request):
     if not (auth_user.user.has_permission("ALLOW_USER_OFFBOARD") or group.member_is_owner(auth_user.user)):
         return {"error": USER_UNAUTHORIZED_MESSAGE}
 
-    revoke_access_memberships = []
-    for membership in group.get_all_approved_members():
-        if access_exist_in_other_groups_of_user(membership, group, mapping.access):
-            continue
-        revoke_access_memberships.append(membership)
-
+    user_access_mappings = list(
+        get_member_access_mappings_not_in_other_groups(group, mapping.access)
+        .filter(status__in=NON_APPROVED_STATUSES + GRANTED_STATUSES)
+        .only("id", "request_id", "status")
+    )
     with transaction.atomic():
-        for membership in revoke_access_memberships:
-            revoke_user_access(membership.user, mapping.access, auth_user.user, "Access revoked for the group")
-
-    mapping.mark_revoked(auth_user.user)
+        decline_and_revoke_user_access_mappings(
+            user_access_mappings, auth_user.user, "Access revoked for the group"
+        )
+        mapping.mark_revoked(auth_user.user)
 
     return {"message": "Successfully initiated the revoke"}
 
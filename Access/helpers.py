@@ -1,43 +1,114 @@
-from django.template import loader
+from django.template import loader, TemplateDoesNotExist
 from os.path import dirname, basename, isfile, join
 import glob
+import importlib
+import json
 import logging
 import re
 import datetime
 import random
+import threading
+from types import MappingProxyType
 
-from Access.access_modules import *  # NOQA
 from EnigmaAutomation.settings import PERMISSION_CONSTANTS
 from Access.models import User
 
 logger = logging.getLogger(__name__)
 
-available_accesses = []
-cached_accesses = []
+ACCESS_MODULES_MANIFEST_PATH = join(dirname(__file__), "access_modules", "manifest.json")
+
+# compiled templates by filename, filled on startup by AccessConfig.ready
+compiled_templates = {}
+
+
+class AccessModuleRegistry:
+    """
+    Available access modules by tag. Modules listed in the manifest written by
+    scripts/clone_access_modules.py are imported on their first lookup, all
+    others on the first full listing. Reads never copy, the listing is a
+    read-only view of the registry.
+    """
+
+    def __init__(self, manifest_path=ACCESS_MODULES_MANIFEST_PATH):
+        self._manifest_path = manifest_path
+        self._manifest = None
+        self._lock = threading.RLock()
+        self._modules = {}
+        self._modules_view = MappingProxyType(self._modules)
+        self._unavailable_tags = set()
+        self._all_loaded = False
+        self._identity_templates = None
+
+    def get(self, tag):
+        access = self._modules.get(tag)
+        if access is not None or self._all_loaded or tag in self._unavailable_tags:
+            return access
+
+        with self._lock:
+            if tag in self._modules or tag in self._unavailable_tags:
+                return self._modules.get(tag)
+            import_path = self._get_manifest().get(tag)
+            if import_path is None:
+                # module tag is not known without importing every module
+                return self.all().get(tag)
+            self._add(tag, _load_access_module(import_path))
+            return self._modules.get(tag)
+
+    def all(self):
+        if not self._all_loaded:
+            with self._lock:
+                if not self._all_loaded:
+                    for access in _get_modules_on_disk():
+                        tag = access.tag()
+                        # keep the instances of lazily imported modules
+                        if not (tag in self._modules or tag in self._unavailable_tags):
+                            self._add(tag, access)
+                    self._all_loaded = True
+        return self._modules_view
+
+    def identity_templates(self):
+        """ Identity template of every available module by tag, empty for modules without one """
+        if self._identity_templates is None:
+            modules = self.all()
+            with self._lock:
+                if self._identity_templates is None:
+                    self._identity_templates = MappingProxyType({
+                        tag: access.get_identity_template()
+                        for tag, access in modules.items()
+                    })
+        return self._identity_templates
+
+    def _add(self, tag, access):
+        if access.available:
+            self._modules[tag] = access
+        else:
+            self._unavailable_tags.add(tag)
+
+    def _get_manifest(self):
+        if self._manifest is None:
+            self._manifest = {}
+            if isfile(self._manifest_path):
+                with open(self._manifest_path) as manifest_file:
+                    self._manifest = json.load(manifest_file)["modules"]
+        return self._manifest
+
+
+access_module_registry = AccessModuleRegistry()
 
 
 def get_available_access_module_from_tag(tag):
-    all_modules = get_available_access_modules()
-    if tag in all_modules:
-        return get_available_access_modules()[tag]
-    return None
+    return access_module_registry.get(tag)
 
 
 def get_available_access_modules():
-    global available_accesses
-    if len(available_accesses) > 0:
-        return available_accesses.copy()
+    return access_module_registry.all()
 
-    available_accesses = {
-        access.tag(): access for access in _get_modules_on_disk() if access.available
-    }
-    return available_accesses.copy()
+
+def get_access_module_identity_templates():
+    return access_module_registry.identity_templates()
 
 
 def _get_modules_on_disk():
-    global cached_accesses
-    if len(cached_accesses) > 0:
-        return cached_accesses
     access_modules_dirs = glob.glob(join(dirname(__file__), "access_modules", "*"))
     # create a deepcopy copy of the list so we can remove items from the original list
     access_modules_dirs_copy = access_modules_dirs[:]
@@ -45,12 +116,15 @@ def _get_modules_on_disk():
         if re.search(r"/(base_|__pycache__|secrets)", each_dir):
             access_modules_dirs.remove(each_dir)
     access_modules_dirs.sort()
-    cached_accesses = [
-        globals()[basename(f)].access.get_object()
+    return [
+        _load_access_module("Access.access_modules.%s.access" % basename(f))
         for f in access_modules_dirs
         if not isfile(f)
     ]
-    return cached_accesses
+
+
+def _load_access_module(import_path):
+    return importlib.import_module(import_path).get_object()
 
 
 def check_user_permissions(user, permissions):
@@ -74,12 +148,30 @@ def sla_breached(requested_on):
     return hours >= 24
 
 
+def get_compiled_template(filename):
+    template = compiled_templates.get(filename)
+    if template is None:
+        template = loader.get_template(filename)
+        compiled_templates[filename] = template
+    return template
+
+
+def preload_templates(filenames):
+    for filename in filenames:
+        try:
+            get_compiled_template(filename)
+        except TemplateDoesNotExist:
+            logger.error("Could not preload template %s", filename)
+
+
 def generateStringFromTemplate(filename, **kwargs):
-    template = loader.get_template(filename)
-    vals = {}
-    for key, value in kwargs.items():
-        vals[key] = value
-    return template.render(vals)
+    return get_compiled_template(filename).render(kwargs)
+
+
+def generateStringsFromTemplate(filename, contexts):
+    """ Render every context against one compiled template """
+    template = get_compiled_template(filename)
+    return [template.render(context) for context in contexts]
 
 
 def getPossibleApproverPermissions():
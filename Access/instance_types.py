@@ -0,0 +1,60 @@
+""" EC2 regions and instance types from instanceTypes.json, for access modules """
+from types import MappingProxyType
+
+from scripts.config_loader import load_json_file
+
+INSTANCE_TYPES_FILE_PATH = "instanceTypes.json"
+
+
+class InstanceTypeCatalog:
+    """
+    Region to instance type catalog. Only the type names and their display
+    names are kept. The file is loaded through the config loader, which
+    parses it again when it changes, and the lookups are rebuilt only then.
+    """
+
+    def __init__(self, path=INSTANCE_TYPES_FILE_PATH):
+        self.path = path
+        # data the lookups were built from, the regions and the instance types
+        self._catalog = (None, (), MappingProxyType({}))
+
+    def _load(self):
+        data = load_json_file(self.path, hot_reload=True)
+        if data is not self._catalog[0]:
+            self._catalog = (
+                data,
+                tuple(data.keys()),
+                MappingProxyType({
+                    region: MappingProxyType({
+                        instance_type["type"]: instance_type["dispName"]
+                        for instance_type in region_data.get("instanceTypes", [])
+                    })
+                    for region, region_data in data.items()
+                }),
+            )
+        return self._catalog
+
+    def get_regions(self):
+        return self._load()[1]
+
+    def get_instance_types(self, region):
+        """ Instance type to display name for the region, empty if unknown """
+        return self._load()[2].get(region, MappingProxyType({}))
+
+    def get_instance_type_display_name(self, region, instance_type):
+        return self.get_instance_types(region).get(instance_type)
+
+
+instance_type_catalog = InstanceTypeCatalog()
+
+
+def get_regions():
+    return instance_type_catalog.get_regions()
+
+
+def get_instance_types(region):
+    return instance_type_catalog.get_instance_types(region)
+
+
+def get_instance_type_display_name(region, instance_type):
+    return instance_type_catalog.get_instance_type_display_name(region, instance_type)
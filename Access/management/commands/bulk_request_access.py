@@ -0,0 +1,53 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Access.bulk_access_request import (
+    BulkAccessRequestException,
+    create_bulk_access_requests,
+    validate_bulk_access_requests,
+)
+from Access.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Request accesses for many users from a JSON list of email, accessTag,"
+        " accessLabels and reason, printing one JSON report per request"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "requests_file", help="Path of the JSON requests file, - for stdin"
+        )
+        parser.add_argument(
+            "--requester",
+            required=True,
+            help="Email of the user submitting, and approving, the requests",
+        )
+        parser.add_argument(
+            "--auto-approve",
+            action="store_true",
+            help="Grant the requests of modules which can auto approve",
+        )
+
+    def handle(self, *args, **options):
+        requester = User.get_user_by_email(options["requester"])
+        if not requester:
+            raise CommandError("Requester %s not found" % options["requester"])
+
+        try:
+            if options["requests_file"] == "-":
+                items = json.load(sys.stdin)
+            else:
+                with open(options["requests_file"]) as requests_file:
+                    items = json.load(requests_file)
+            validate_bulk_access_requests(items)
+        except (OSError, ValueError, BulkAccessRequestException) as e:
+            raise CommandError(str(e))
+
+        for report in create_bulk_access_requests(
+            requester, items, auto_approve=options["auto_approve"]
+        ):
+            self.stdout.write(json.dumps(report))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from Access import views_helper
+
+
+class Command(BaseCommand):
+    help = (
+        "Add the active users who are not approved members of"
+        " DEFAULT_ACCESS_GROUP to it and grant them the group accesses"
+    )
+
+    def handle(self, *args, **options):
+        enrolled_count = views_helper.enroll_users_missing_from_default_access_group()
+        self.stdout.write("Enrolled %s users in the default group" % enrolled_count)
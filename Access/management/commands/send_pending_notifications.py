@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from Access import background_task_manager
+
+
+class Command(BaseCommand):
+    help = (
+        "Send the notifications whose scheduled send was lost. Run it"
+        " periodically, e.g. from cron, when celery beat is not running"
+    )
+
+    def handle(self, *args, **options):
+        background_task_manager.send_due_access_grant_digests()
+        background_task_manager.send_outbound_notifications()
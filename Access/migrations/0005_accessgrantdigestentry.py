@@ -0,0 +1,30 @@
+# Generated by Django 4.1.9 on 2026-10-19 08:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Access', '0004_storedpassword'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccessGrantDigestEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest_key', models.CharField(db_index=True, max_length=255)),
+                ('access_tag', models.CharField(max_length=255)),
+                ('email_targets', models.JSONField(default=list)),
+                ('user_email', models.EmailField(blank=True, max_length=254, null=True)),
+                ('label_desc', models.TextField(blank=True, null=True)),
+                ('approver', models.CharField(blank=True, max_length=255, null=True)),
+                ('status', models.CharField(choices=[('Pending', 'pending'), ('Sent', 'sent'), ('Failed', 'failed')], default='Pending', max_length=100)),
+                ('created_on', models.DateTimeField(auto_now_add=True)),
+                ('updated_on', models.DateTimeField(auto_now=True)),
+                ('user_access_mapping', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='digest_entries', to='Access.useraccessmapping')),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.1.9 on 2026-10-19 08:53
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Access', '0005_accessgrantdigestentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboundNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('destination', models.JSONField(default=list)),
+                ('subject', models.TextField()),
+                ('body', models.TextField()),
+                ('status', models.CharField(choices=[('Pending', 'pending'), ('Sent', 'sent'), ('Failed', 'failed')], default='Pending', max_length=100)),
+                ('attempts', models.IntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('next_attempt_on', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_on', models.DateTimeField(auto_now_add=True)),
+                ('updated_on', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='outboundnotification',
+            index=models.Index(fields=['status', 'next_attempt_on'], name='Access_outb_status_4ffdd3_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.9 on 2026-10-19 09:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Access', '0006_outboundnotification'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='membershipv2',
+            index=models.Index(fields=['user', 'status'], name='Access_memb_user_id_9371cd_idx'),
+        ),
+    ]
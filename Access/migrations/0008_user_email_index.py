@@ -0,0 +1,18 @@
+# Generated by Django 4.1.9 on 2026-10-19 09:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Access', '0007_membershipv2_user_status_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='email',
+            field=models.EmailField(db_index=True, max_length=254, null=True),
+        ),
+    ]
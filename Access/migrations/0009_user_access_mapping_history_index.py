@@ -0,0 +1,17 @@
+# Generated by Django 4.1.9 on 2026-10-19 09:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Access', '0008_user_email_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='useraccessmapping',
+            index=models.Index(fields=['user_identity', 'requested_on'], name='Access_user_user_id_e47f2f_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.9 on 2026-10-19 09:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Access', '0009_user_access_mapping_history_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='accessgrantdigestentry',
+            name='status',
+            field=models.CharField(choices=[('Pending', 'pending'), ('Sending', 'sending'), ('Sent', 'sent'), ('Failed', 'failed')], default='Pending', max_length=100),
+        ),
+    ]
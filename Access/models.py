@@ -1,10 +1,19 @@
 from django.contrib.auth.models import User as user
+from django.core.cache import cache
+from django.core.paginator import Paginator
 from django.db import models, transaction
+from django.db.models import Max, Min
 from django.db.models.signals import post_save
+from django.utils import timezone
 from django.conf import settings
 from EnigmaAutomation.settings import PERMISSION_CONSTANTS
 import datetime
+import hashlib
+import threading
 import enum
+import uuid
+
+ACCESS_HISTORY_PAGE_SIZE = 40
 
 
 class StoredPassword(models.Model):
@@ -84,7 +93,7 @@ class User(models.Model):
     )
     name = models.CharField(max_length=255, null=True, blank=False)
 
-    email = models.EmailField(null=True, blank=False)
+    email = models.EmailField(null=True, blank=False, db_index=True)
     phone = models.IntegerField(null=True, blank=True)
 
     is_bot = models.BooleanField(null=False, blank=False, default=False)
@@ -242,28 +251,51 @@ class User(models.Model):
         except User.DoesNotExist:
             return None
 
-    def get_user_access_mappings(self):
-        all_user_identities = self.module_identity.all()
-        access_request_mappings = []
-        for each_identity in all_user_identities:
-            access_request_mappings.extend(
-                each_identity.user_access_mapping.prefetch_related(
-                    "access", "approver_1", "approver_2"
-                )
+    def get_user_access_mappings(self, access_tag=None, status=None):
+        """ Access mappings of all the user's identities, newest first """
+        access_request_mappings = UserAccessMapping.objects.filter(
+            user_identity__user_id=self.id
+        ).select_related(
+            "access",
+            "user_identity__user",
+            "approver_1__user",
+            "approver_2__user",
+            "revoker__user",
+        ).order_by("-requested_on", "-id")
+        if access_tag:
+            access_request_mappings = access_request_mappings.filter(
+                access__access_tag=access_tag
             )
+        if status:
+            access_request_mappings = access_request_mappings.filter(status=status)
         return access_request_mappings
 
-    def get_access_history(self, all_access_modules):
-        access_request_mappings = self.get_user_access_mappings()
+    def get_access_history(
+        self,
+        all_access_modules,
+        page=1,
+        access_tag=None,
+        status=None,
+        page_size=ACCESS_HISTORY_PAGE_SIZE,
+    ):
+        paginator = Paginator(
+            self.get_user_access_mappings(access_tag=access_tag, status=status),
+            page_size,
+        )
+        access_page = paginator.get_page(page)
         access_history = []
 
-        for request_mapping in access_request_mappings:
+        for request_mapping in access_page:
             access_module = all_access_modules[request_mapping.access.access_tag]
             access_history.append(
                 request_mapping.getAccessRequestDetails(access_module)
             )
 
-        return access_history
+        return {
+            "dataList": access_history,
+            "current_page": access_page.number,
+            "last_page": paginator.num_pages,
+        }
 
     @staticmethod
     def get_user_from_username(username):
@@ -295,9 +327,10 @@ class User(models.Model):
         self.save()
 
     def revoke_all_memberships(self):
-        self.membership_user.filter(status__in=["Pending", "Approved"]).update(
-            status="Revoked"
-        )
+        memberships = self.membership_user.filter(status__in=["Pending", "Approved"])
+        group_ids = list(memberships.values_list("group_id", flat=True))
+        memberships.update(status="Revoked")
+        invalidate_group_access_lists(group_ids)
 
     def get_or_create_active_identity(self, access_tag):
         identity, created = self.module_identity.get_or_create(
@@ -307,7 +340,7 @@ class User(models.Model):
 
     @staticmethod
     def get_users_by_emails(emails):
-        return User.objects.filter(email__in=emails)
+        return User.objects.filter(email__in=emails).select_related("user")
 
     @staticmethod
     def get_user_by_email(email):
@@ -340,14 +373,41 @@ def create_user(sender, instance, created, **kwargs):
     """
     create a user when a django  user is created
     """
-    user, created = User.objects.get_or_create(user=instance)
-    user.name = instance.first_name
-    user.email = instance.email
+    user, is_new_user = User.objects.get_or_create(user=instance)
+    django_user_fields = {"name": instance.first_name, "email": instance.email}
     try:
-        user.avatar = instance.avatar
+        django_user_fields["avatar"] = instance.avatar
     except Exception as e:
         pass
-    user.save()
+    # logins save the django user too, the user is only saved on changes
+    changed_fields = [
+        field
+        for field, value in django_user_fields.items()
+        if getattr(user, field) != value
+    ]
+    for field in changed_fields:
+        setattr(user, field, django_user_fields[field])
+    if changed_fields:
+        user.save(update_fields=changed_fields)
+
+    if is_new_user:
+        transaction.on_commit(lambda: enroll_in_default_access_group(user.id))
+
+
+def enroll_in_default_access_group(user_id):
+    # background_task_manager imports models
+    from Access.background_task_manager import background_task
+
+    background_task("run_default_group_enrollment", user_id)
+
+
+def invalidate_group_access_lists(group_ids):
+    """ Membership updates through querysets send no save signals """
+    # group_access_list imports models
+    from Access.group_access_list import invalidate_group_access_list
+
+    for group_id in set(group_ids):
+        invalidate_group_access_list(group_id)
 
 post_save.connect(create_user, sender=user)
 
@@ -451,6 +511,7 @@ class MembershipV2(models.Model):
     def update_membership(group, reason):
         membership = MembershipV2.objects.filter(group=group)
         membership.update(status="Declined", decline_reason=reason)
+        invalidate_group_access_lists([group.id])
 
     @staticmethod
     def get_membership(membership_id):
@@ -459,6 +520,11 @@ class MembershipV2(models.Model):
         except MembershipV2.DoesNotExist:
             return None
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "status"]),
+        ]
+
     def __str__(self):
         return self.group.name + "-" + self.user.email + "-" + self.status
 
@@ -525,14 +591,21 @@ class GroupV2(models.Model):
             needsAccessApprove=needsAccessApprove,
         )
 
+    def new_membership_id(self, user, date_time=""):
+        # the random suffix keeps ids unique when a user is added again
+        # with the same date_time
+        return "%s-%s-membership-%s-%s" % (
+            user.user.username,
+            self.name,
+            date_time or datetime.datetime.utcnow().strftime("%Y%m%d%H%M%S"),
+            uuid.uuid4().hex[:8],
+        )
+
     def add_member(
         self, user=None, is_owner=False, requested_by=None, reason="", date_time=""
     ):
-        membership_id = (
-            str(user.user.username) + "-" + self.name + "-membership-" + date_time
-        )
         return self.membership_group.create(
-            membership_id=membership_id,
+            membership_id=self.new_membership_id(user, date_time),
             user=user,
             is_owner=is_owner,
             requested_by=requested_by,
@@ -540,14 +613,52 @@ class GroupV2(models.Model):
         )
 
     def add_members(self, users=None, requested_by=None, reason="", date_time=""):
-        if users:
-            for usr in users:
-                self.add_member(
+        """
+        Add the users as members with one insert. Users who are already
+        approved or pending members are skipped.
+
+        The group row is locked while checking and inserting, so concurrent
+        adds to the group see each other's members.
+
+        Returns the new memberships and the skipped users.
+        """
+        users = list(users or [])
+        if not users:
+            return [], []
+        with transaction.atomic():
+            list(
+                GroupV2.objects.select_for_update()
+                .filter(id=self.id)
+                .values_list("id", flat=True)
+            )
+            # a locking read sees memberships committed while waiting
+            existing_member_ids = set(
+                self.membership_group.select_for_update()
+                .filter(user__in=users, status__in=["Approved", "Pending"])
+                .values_list("user_id", flat=True)
+            )
+            new_memberships = [
+                MembershipV2(
+                    membership_id=self.new_membership_id(usr, date_time),
                     user=usr,
+                    group=self,
                     requested_by=requested_by,
                     reason=reason,
-                    date_time=date_time,
                 )
+                for usr in users
+                if usr.id not in existing_member_ids
+            ]
+            MembershipV2.objects.bulk_create(new_memberships)
+        # read back as MySQL does not return the ids of bulk inserted rows
+        memberships = list(
+            self.membership_group.filter(
+                membership_id__in=[
+                    membership.membership_id for membership in new_memberships
+                ]
+            ).select_related("user", "requested_by")
+        )
+        skipped_users = [usr for usr in users if usr.id in existing_member_ids]
+        return memberships, skipped_users
 
     def getPendingMemberships():
         return MembershipV2.objects.filter(status="Pending", group__status="Approved")
@@ -609,6 +720,7 @@ class GroupV2(models.Model):
         self.membership_group.filter(status="Pending").update(
             status="Approved", approver=approved_by
         )
+        invalidate_group_access_lists([self.id])
 
     def get_all_members(self):
         group_members = self.membership_group.all()
@@ -653,6 +765,7 @@ class GroupV2(models.Model):
         self.membership_group.filter(status="Approved").update(
             status="Pending", approver=None
         )
+        invalidate_group_access_lists([self.id])
 
     def is_owner(self, user):
         return (
@@ -777,6 +890,11 @@ class UserAccessMapping(models.Model):
         on_delete=models.PROTECT,
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user_identity", "requested_on"]),
+        ]
+
     def __str__(self):
         return self.request_id
 
@@ -1269,10 +1387,10 @@ class UserIdentity(models.Model):
     def replicate_active_access_membership_for_module(
         self, existing_user_access_mapping
     ):
+        base_datetime_prefix = datetime.datetime.utcnow().strftime("%Y%m%d%H%M%S")
         new_user_access_mapping = []
 
         for i, user_access in enumerate(existing_user_access_mapping):
-            base_datetime_prefix = datetime.datetime.utcnow().strftime("%Y%m%d%H%M%S")
             request_id = (
                 self.user.user.username
                 + "-"
@@ -1287,17 +1405,26 @@ class UserIdentity(models.Model):
                 access_status = "Processing"
 
             new_user_access_mapping.append(
-                self.user_access_mapping.create(
+                UserAccessMapping(
+                    user_identity=self,
                     request_id=request_id,
-                    access=user_access.access,
-                    approver_1=user_access.approver_1,
-                    approver_2=user_access.approver_2,
+                    access_id=user_access.access_id,
+                    approver_1_id=user_access.approver_1_id,
+                    approver_2_id=user_access.approver_2_id,
                     request_reason=user_access.request_reason,
                     access_type=user_access.access_type,
                     status=access_status,
                 )
             )
-        return new_user_access_mapping
+        UserAccessMapping.objects.bulk_create(new_user_access_mapping)
+        # read back as MySQL does not return the ids of bulk inserted rows
+        return list(
+            self.user_access_mapping.filter(
+                request_id__in=[
+                    mapping.request_id for mapping in new_user_access_mapping
+                ]
+            ).order_by("id")
+        )
 
     def create_access_mapping(
         self,
@@ -1324,3 +1451,284 @@ class UserIdentity(models.Model):
 
     def __str__(self):
         return "%s" % (self.identity)
+
+
+class AccessGrantDigestEntry(models.Model):
+    """
+    Grant waiting to be mailed as part of a digest by an email only access module.
+    Entries with the same digest_key are sent together in one tabular email.
+    """
+
+    # entries claimed by a sender are picked up again if it dies before
+    # marking them sent or failed
+    CLAIM_LEASE_SECONDS = 300
+    SCHEDULED_CACHE_PREFIX = "access_grant_digest:scheduled"
+    # a scheduled flag left by a rolled back grant only delays the next send
+    SCHEDULED_CACHE_TTL_SECONDS = 3600
+
+    digest_key = models.CharField(max_length=255, null=False, blank=False, db_index=True)
+    access_tag = models.CharField(max_length=255)
+    email_targets = models.JSONField(default=list)
+
+    user_access_mapping = models.ForeignKey(
+        "UserAccessMapping",
+        null=False,
+        blank=False,
+        related_name="digest_entries",
+        on_delete=models.CASCADE,
+    )
+    user_email = models.EmailField(null=True, blank=True)
+    label_desc = models.TextField(null=True, blank=True)
+    approver = models.CharField(max_length=255, null=True, blank=True)
+
+    STATUS_CHOICES = (
+        ("Pending", "pending"),
+        ("Sending", "sending"),
+        ("Sent", "sent"),
+        ("Failed", "failed"),
+    )
+    status = models.CharField(
+        max_length=100,
+        null=False,
+        blank=False,
+        choices=STATUS_CHOICES,
+        default="Pending",
+    )
+    created_on = models.DateTimeField(auto_now_add=True)
+    updated_on = models.DateTimeField(auto_now=True)
+
+    @staticmethod
+    def get_digest_key(access_tag, email_targets):
+        targets = ",".join(sorted(set(email_targets)))
+        return hashlib.sha1((access_tag + ":" + targets).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def add(access_tag, email_targets, user_access_mapping, label_desc, approver):
+        """Add a grant to its digest, returns True if no send was scheduled"""
+        digest_key = AccessGrantDigestEntry.get_digest_key(access_tag, email_targets)
+        AccessGrantDigestEntry.objects.create(
+            digest_key=digest_key,
+            access_tag=access_tag,
+            email_targets=list(email_targets),
+            user_access_mapping=user_access_mapping,
+            user_email=user_access_mapping.user_identity.user.email,
+            label_desc=label_desc,
+            approver=str(approver),
+        )
+        return digest_key, AccessGrantDigestEntry.mark_send_scheduled(digest_key)
+
+    @staticmethod
+    def _get_scheduled_key(digest_key):
+        return "%s:%s" % (AccessGrantDigestEntry.SCHEDULED_CACHE_PREFIX, digest_key)
+
+    @staticmethod
+    def mark_send_scheduled(digest_key):
+        """Returns True for the one caller which has to schedule the send"""
+        # cache.add is atomic, of concurrent grants only one adds the key
+        return cache.add(
+            AccessGrantDigestEntry._get_scheduled_key(digest_key),
+            True,
+            AccessGrantDigestEntry.SCHEDULED_CACHE_TTL_SECONDS,
+        )
+
+    @staticmethod
+    def clear_send_scheduled(digest_key):
+        cache.delete(AccessGrantDigestEntry._get_scheduled_key(digest_key))
+
+    @staticmethod
+    def get_pending_entries(digest_key):
+        return AccessGrantDigestEntry.objects.filter(
+            digest_key=digest_key, status="Pending"
+        )
+
+    @staticmethod
+    def get_pending_digests():
+        """Digest key, access tag and first grant time of digests with pending grants"""
+        return (
+            AccessGrantDigestEntry.objects.filter(status="Pending")
+            .values("digest_key", "access_tag")
+            .annotate(first_created_on=Min("created_on"))
+        )
+
+    @staticmethod
+    def claim_pending_entries(digest_key):
+        """Mark the pending entries of the digest as Sending and return them.
+
+        Entries locked or claimed by a concurrent sender are left to it, so
+        every entry is mailed by one sender only.
+        """
+        with transaction.atomic():
+            entry_ids = list(
+                AccessGrantDigestEntry.get_pending_entries(digest_key)
+                .select_for_update(skip_locked=True)
+                .values_list("id", flat=True)
+            )
+            claimed_count = AccessGrantDigestEntry.objects.filter(
+                id__in=entry_ids, status="Pending"
+            ).update(status="Sending", updated_on=timezone.now())
+            if claimed_count != len(entry_ids):
+                # without row locks, as on sqlite, another sender claimed
+                # them between the read and the update
+                transaction.set_rollback(True)
+                return []
+        return list(
+            AccessGrantDigestEntry.objects.filter(id__in=entry_ids)
+            .select_related("user_access_mapping")
+            .order_by("created_on")
+        )
+
+    @staticmethod
+    def release_expired_claims():
+        """Make entries claimed by a sender which died pending again"""
+        lease_start = timezone.now() - datetime.timedelta(
+            seconds=AccessGrantDigestEntry.CLAIM_LEASE_SECONDS
+        )
+        return AccessGrantDigestEntry.objects.filter(
+            status="Sending", updated_on__lt=lease_start
+        ).update(status="Pending", updated_on=timezone.now())
+
+    @staticmethod
+    def mark_sent(entry_ids):
+        AccessGrantDigestEntry.objects.filter(id__in=entry_ids).update(status="Sent")
+
+    @staticmethod
+    def mark_failed(entry_ids, fail_reason):
+        AccessGrantDigestEntry.objects.filter(id__in=entry_ids).update(status="Failed")
+        UserAccessMapping.objects.filter(digest_entries__id__in=entry_ids).update(
+            status="GrantFailed", fail_reason=fail_reason
+        )
+
+    def __str__(self):
+        return "%s - %s" % (self.access_tag, self.user_access_mapping_id)
+
+
+# id of the last notification covered by a send scheduled by the thread
+_scheduled_sends = threading.local()
+
+
+class OutboundNotification(models.Model):
+    """
+    Email written in the same transaction as the change it notifies about.
+    Pending notifications are sent by a background worker with retries.
+    """
+
+    MAX_ATTEMPTS = 5
+    RETRY_BACKOFF_SECONDS = 60
+    # a claimed notification is picked up again if its worker dies before
+    # marking it sent or failed
+    CLAIM_LEASE_SECONDS = 300
+
+    destination = models.JSONField(default=list)
+    subject = models.TextField()
+    body = models.TextField()
+
+    STATUS_CHOICES = (
+        ("Pending", "pending"),
+        ("Sent", "sent"),
+        ("Failed", "failed"),
+    )
+    status = models.CharField(
+        max_length=100,
+        null=False,
+        blank=False,
+        choices=STATUS_CHOICES,
+        default="Pending",
+    )
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(null=True, blank=True)
+    next_attempt_on = models.DateTimeField(default=timezone.now)
+    created_on = models.DateTimeField(auto_now_add=True)
+    updated_on = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_on"]),
+        ]
+
+    @staticmethod
+    def enqueue(destination, subject, body):
+        """Save a notification, it is sent once the current transaction commits"""
+        if not (destination and subject and body):
+            raise Exception("Make sure all fields are entered and valid.")
+        if isinstance(destination, str):
+            destination = [destination]
+        notification = OutboundNotification.objects.create(
+            destination=list(destination), subject=subject, body=body
+        )
+        transaction.on_commit(
+            lambda: OutboundNotification.schedule_send_after_commit(notification.id)
+        )
+        return notification
+
+    @staticmethod
+    def schedule_send_after_commit(notification_id):
+        """Schedule a send of the committed notification.
+
+        Skipped when the thread scheduled a send after the notification was
+        committed, so one send picks up all the notifications of a commit.
+        """
+        if notification_id <= getattr(_scheduled_sends, "up_to_id", 0):
+            return
+        # ids only grow, later notifications of the thread are not covered
+        _scheduled_sends.up_to_id = OutboundNotification.objects.aggregate(
+            Max("id")
+        )["id__max"]
+        OutboundNotification.schedule_send()
+
+    @staticmethod
+    def schedule_send(countdown=0):
+        # background_task_manager imports models
+        from Access import background_task_manager
+
+        background_task_manager.schedule_outbound_notifications(countdown)
+
+    @staticmethod
+    def get_due_notifications():
+        return OutboundNotification.objects.filter(
+            status="Pending", next_attempt_on__lte=timezone.now()
+        )
+
+    @staticmethod
+    def claim_due_notifications(limit):
+        """Lease due notifications to the calling worker"""
+        claimed = []
+        lease_until = timezone.now() + datetime.timedelta(
+            seconds=OutboundNotification.CLAIM_LEASE_SECONDS
+        )
+        for notification in OutboundNotification.get_due_notifications().order_by(
+            "next_attempt_on"
+        )[:limit]:
+            is_claimed = OutboundNotification.objects.filter(
+                id=notification.id,
+                status="Pending",
+                next_attempt_on=notification.next_attempt_on,
+            ).update(next_attempt_on=lease_until)
+            if is_claimed:
+                claimed.append(notification)
+        return claimed
+
+    def mark_sent(self):
+        self.status = "Sent"
+        self.attempts += 1
+        self.last_error = None
+        self.save()
+
+    def mark_attempt_failed(self, error):
+        """Returns the seconds until the next attempt, None if out of attempts"""
+        self.attempts += 1
+        self.last_error = error
+        retry_in = None
+        if self.attempts >= OutboundNotification.MAX_ATTEMPTS:
+            self.status = "Failed"
+        else:
+            retry_in = OutboundNotification.RETRY_BACKOFF_SECONDS * 2 ** (
+                self.attempts - 1
+            )
+            self.next_attempt_on = timezone.now() + datetime.timedelta(
+                seconds=retry_in
+            )
+        self.save()
+        return retry_in
+
+    def __str__(self):
+        return "%s - %s" % (self.subject, self.status)
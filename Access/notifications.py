@@ -1,5 +1,5 @@
-from bootprocess import general
 from Access import helpers
+from Access.models import OutboundNotification
 from EnigmaAutomation.settings import MAIL_APPROVER_GROUPS
 import logging
 
@@ -25,6 +25,22 @@ USER_ACCESS_REQUEST_GRANT_FAILURE_SUBJECT = "[Enigma][Access Management] {} - {}
     Failed to Approve Request"
 USER_REQUEST_RESOLVE_SUBJECT = "[Enigma][Access Management] - Request Resolved - {}"
 
+# Compiled once on startup, see AccessConfig.ready
+NOTIFICATION_TEMPLATES = [
+    "acceptGroupAccessFailed.html",
+    "add_access_to_group.html",
+    "add_user_to_group_mail.html",
+    "celery_revoke_failure_email.html",
+    "declineGroupAccessFailed.html",
+    "email.html",
+    "groupAccessDeclined.html",
+    "groupCreationEmailBody.html",
+    "listToTable.html",
+    "membershipAcceptedEmailBody.html",
+    "requestDeclineEmail.html",
+    "requestResolvedEmail.html",
+]
+
 
 def send_new_group_create_notification(auth_user, date_time, new_group, member_list):
     subject = NEW_GROUP_EMAIL_SUBJECT + auth_user.email + " -- " + date_time
@@ -39,8 +55,8 @@ def send_new_group_create_notification(auth_user, date_time, new_group, member_l
         reason=new_group.description,
         needsAccessApprove=new_group.needsAccessApprove,
     )
-    general.emailSES(MAIL_APPROVER_GROUPS, subject, body)
-    logger.debug("Email sent for " + subject + " to " + str(MAIL_APPROVER_GROUPS))
+    OutboundNotification.enqueue(MAIL_APPROVER_GROUPS, subject, body)
+    logger.debug("Email queued for " + subject + " to " + str(MAIL_APPROVER_GROUPS))
 
 
 def send_new_group_approved_notification(group, group_id, initial_member_names):
@@ -54,8 +70,8 @@ def send_new_group_approved_notification(group, group_id, initial_member_names):
     destination += MAIL_APPROVER_GROUPS[:]
     destination.append(group.requester.email)
     # TODO send a mail to initial members
-    logger.debug(group_id + " -- Approved email sent to - " + str(destination))
-    general.emailSES(destination, subject, body)
+    logger.debug(group_id + " -- Approved email queued for - " + str(destination))
+    OutboundNotification.enqueue(destination, subject, body)
 
 
 def send_membership_accepted_notification(user, group, membership):
@@ -69,22 +85,28 @@ def send_membership_accepted_notification(user, group, membership):
     destination = []
     destination.append(membership.requested_by.email)
     destination.append(user.email)
-    general.emailSES(destination, subject, body)
+    OutboundNotification.enqueue(destination, subject, body)
 
 
 def send_mulitple_membership_accepted_notification(all_user_emails, group_name, membership):
-    for each_user_email in all_user_emails.keys():
+    user_emails = list(all_user_emails.keys())
+    bodies = helpers.generateStringsFromTemplate(
+        "membershipAcceptedEmailBody.html",
+        [
+            {
+                "user_name": ",".join(each_user_email),
+                "group_name": group_name,
+                "approver": membership.approver.name,
+            }
+            for each_user_email in user_emails
+        ],
+    )
+    for each_user_email, body in zip(user_emails, bodies):
         subject = MEMBERSHIP_ACCEPTED_SUBJECT.format(each_user_email, group_name)
-        body = helpers.generateStringFromTemplate(
-            filename="membershipAcceptedEmailBody.html",
-            user_name=",".join(each_user_email),
-            group_name=group_name,
-            approver=membership.approver.name,
-        )
         destination = []
         destination.append(membership.requested_by.email)
         destination.append(each_user_email)
-        general.emailSES(destination, subject, body)
+        OutboundNotification.enqueue(destination, subject, body)
 
 
 def generateGroupMemberTable(memberList):
@@ -100,7 +122,7 @@ def send_group_owners_update_mail(destination, group_name, updated_by):
             group_name, ", ".join(destination), updated_by
         )
 
-        general.emailSES(destination, subject, body)
+        OutboundNotification.enqueue(destination, subject, body)
     except Exception as e:
         logger.exception(str(e))
         logger.error("Something when wrong while sending Email.")
@@ -120,7 +142,7 @@ def send_group_access_add_email(
         ),
     )
     subject = GROUP_ACCESS_ADDED_SUBJECT.format(group_name=group_name)
-    general.emailSES(destination, subject, body)
+    OutboundNotification.enqueue(destination, subject, body)
     return ""
 
 
@@ -138,7 +160,7 @@ def send_revoke_failure_mail(
             access_tag=access_tag,
         )
 
-        general.emailSES(targets, subject, body)
+        OutboundNotification.enqueue(targets, subject, body)
     except Exception as e:
         logger.error("Something when wrong while sending membership revoke email")
         logger.exception(str(e))
@@ -159,8 +181,8 @@ def send_mail_for_request_decline(
         approver=request.user.username,
         reason=reason,
     )
-    general.emailSES(destination, subject, body)
-    logger.debug("Email sent for " + subject + " to " + str(destination))
+    OutboundNotification.enqueue(destination, subject, body)
+    logger.debug("Email queued for " + subject + " to " + str(destination))
 
 
 def send_mail_for_request_granted_failure(user, approver, access_type, request_id):
@@ -173,8 +195,8 @@ def send_mail_for_request_granted_failure(user, approver, access_type, request_i
         str(user.email),
         request_id,
     )
-    general.emailSES(destination, subject, body)
-    logger.debug("Email sent for " + subject + " to " + str(destination))
+    OutboundNotification.enqueue(destination, subject, body)
+    logger.debug("Email queued for " + subject + " to " + str(destination))
 
 
 def send_mail_for_member_approval(userEmail, requester, group_name, reason):
@@ -199,7 +221,7 @@ def send_mail_for_member_approval(userEmail, requester, group_name, reason):
             reason,
         ),
     )
-    general.emailSES(destination, subject, body)
+    OutboundNotification.enqueue(destination, subject, body)
 
 
 def generate_user_add_to_group_email_body(
@@ -223,7 +245,7 @@ def send_mail_for_access_grant_failed(
     subject = str("Access Grant Failed - ") + access_type.upper()
     body = ACCESS_GRANT_FAILED_MESSAGE.format(user_email, request_id)
     body = body + "Failure Reason - " + message
-    general.emailSES(destination, subject, body)
+    OutboundNotification.enqueue(destination, subject, body)
 
 
 def send_group_access_declined(
@@ -240,7 +262,7 @@ def send_group_access_declined(
     )
 
     subject = subject = "Declined Request " + request_id
-    general.emailSES(destination, subject, body)
+    OutboundNotification.enqueue(destination, subject, body)
 
 
 def send_accept_group_access_failed(destination, request_id, error):
@@ -250,7 +272,7 @@ def send_accept_group_access_failed(destination, request_id, error):
         )
 
         subject = subject = "Failed Request " + request_id
-        general.emailSES(destination, subject, body)
+        OutboundNotification.enqueue(destination, subject, body)
     except Exception as e:
         logger.exception(str(e))
         logger.error("Something when wrong while sending Email.")
@@ -263,7 +285,7 @@ def send_decline_group_access_failed(destination, request_id, error):
         )
 
         subject = subject = "Declined Failed Request " + request_id
-        general.emailSES(destination, subject, body)
+        OutboundNotification.enqueue(destination, subject, body)
     except Exception as e:
         logger.exception(str(e))
         logger.error("Something when wrong while sending Email.")
@@ -278,5 +300,5 @@ def send_mail_for_request_resolve(auth_user, access_type, request_id):
         request_id=request_id,
         access_type=access_type,
     )
-    general.emailSES(destination, subject, body)
-    logger.debug("Email sent for " + subject + " to " + str(destination))
+    OutboundNotification.enqueue(destination, subject, body)
+    logger.debug("Email queued for " + subject + " to " + str(destination))
@@ -9,55 +9,50 @@ from Access.tests.helper_mocks import MockAccessModule
 
 
 @pytest.mark.parametrize(
-    "testName, available_accesses, expectedModuleList",
+    "testName, modulesOnDisk, expectedModuleNames",
     [
         (
-            "available_accesses has values",
-            {
-                "tag1": MockAccessModule(name="name1"),
-                "tag2": MockAccessModule(name="name2")
-            },
+            "all modules are available",
             [MockAccessModule(name="name1"), MockAccessModule(name="name2")],
+            ["name1", "name2"],
         ),
-        (
-            "available_accesses has no values",
-            {},
-            [MockAccessModule(name="name3"), MockAccessModule(name="name4")],
-        ),
+        ("no modules on disk", [], []),
     ],
 )
 def test_get_available_access_modules(
-    mocker, testName, available_accesses, expectedModuleList
+    mocker, testName, modulesOnDisk, expectedModuleNames
 ):
-    mocker.patch("Access.helpers._get_modules_on_disk", return_value=expectedModuleList)
+    mocker.patch("Access.helpers._get_modules_on_disk", return_value=modulesOnDisk)
+    mocker.patch.object(
+        helpers, "access_module_registry", helpers.AccessModuleRegistry()
+    )
 
-    helpers.available_accesses = available_accesses
-    modules = list(get_available_access_modules().values())
-    assert len(modules) == len(expectedModuleList)
-    for i in range(len(modules)):
-        assert modules[i].name == expectedModuleList[i].name
+    modules = get_available_access_modules()
+    assert [module.name for module in modules.values()] == expectedModuleNames
+    # the registry is loaded once and read without copies
+    assert get_available_access_modules() is modules
+    assert helpers._get_modules_on_disk.call_count == 1
+    with pytest.raises(TypeError):
+        modules["tag"] = MockAccessModule(name="tag")
 
 
-@pytest.mark.parametrize(
-    "testName, cached_accesses, expectedModuleList",
-    [
-        (
-            "cached_accesses has values",
-            [MockAccessModule(name="name1"), MockAccessModule(name="name2")],
-            [MockAccessModule(name="name1"), MockAccessModule(name="name2")],
-        ),
-    ],
-)
-def test_get_modules_on_disk(mocker, testName, cached_accesses, expectedModuleList):
+def test_get_modules_on_disk(mocker):
     mocker.patch(
-        "glob.glob", return_value=["dir1", "dir2"] + ["base_somedir", "__pycache__"]
+        "glob.glob",
+        return_value=["/modules/dir2", "/modules/dir1"]
+        + ["/modules/base_somedir", "/modules/__pycache__"],
     )
-    mocker.patch("os.path.isfile", return_value=False)
-    helpers.cached_accesses = cached_accesses
+    mocker.patch("Access.helpers.isfile", return_value=False)
+    mocker.patch(
+        "Access.helpers._load_access_module",
+        side_effect=lambda import_path: MockAccessModule(name=import_path),
+    )
+
     modules = _get_modules_on_disk()
-    assert len(modules) == len(expectedModuleList)
-    for i in range(len(modules)):
-        assert modules[i].name == expectedModuleList[i].name
+    assert [module.name for module in modules] == [
+        "Access.access_modules.dir1.access",
+        "Access.access_modules.dir2.access",
+    ]
 
 
 @pytest.mark.parametrize(
@@ -116,3 +111,46 @@ def test_getPossibleApproverPermissions(
         "Access.helpers.get_available_access_modules", return_value=modulesPresent
     )
     assert getPossibleApproverPermissions().sort() == expectedApprovers.sort()
+
+
+def test_generateStringsFromTemplate_compiles_template_once(mocker):
+    template = mocker.MagicMock()
+    template.render.side_effect = lambda context: context["name"]
+    mocker.patch("django.template.loader.get_template", return_value=template)
+    mocker.patch.object(helpers, "compiled_templates", {})
+
+    bodies = helpers.generateStringsFromTemplate(
+        "template.html", [{"name": "name1"}, {"name": "name2"}]
+    )
+    body = helpers.generateStringFromTemplate("template.html", name="name3")
+
+    assert bodies == ["name1", "name2"]
+    assert body == "name3"
+    assert helpers.loader.get_template.call_count == 1
+
+
+def test_get_available_access_module_from_tag_imports_only_that_module(
+    mocker, tmp_path
+):
+    manifest_path = tmp_path / "manifest.json"
+    manifest_path.write_text(
+        '{"modules": {"tag1": "Access.access_modules.module1.access"}}'
+    )
+    access_module = MockAccessModule(name="tag1")
+    mocker.patch.object(
+        helpers, "access_module_registry", helpers.AccessModuleRegistry(str(manifest_path))
+    )
+    mocker.patch("Access.helpers._load_access_module", return_value=access_module)
+    mocker.patch("Access.helpers._get_modules_on_disk", return_value=[access_module])
+
+    assert helpers.get_available_access_module_from_tag("tag1") == access_module
+    assert helpers.get_available_access_module_from_tag("tag1") == access_module
+    helpers._load_access_module.assert_called_once_with(
+        "Access.access_modules.module1.access"
+    )
+    assert helpers._get_modules_on_disk.call_count == 0
+
+    # tags missing from the manifest load every module
+    assert helpers.get_available_access_module_from_tag("tag2") is None
+    assert helpers._get_modules_on_disk.call_count == 1
+    assert get_available_access_modules()["tag1"] == access_module
@@ -1,7 +1,6 @@
 from Access import models
 import pytest
 from Access import views_helper
-from bootprocess import general
 
 
 class MockAuthUser:
@@ -289,7 +288,7 @@ def test_run_access_grant(
         mockAccessModule1.tag.return_value = accessType
         mockAccessModule1.approve.return_value = [False, "Cannot be approved"]
         mockAccessModule1.access_mark_revoke_permission.return_value = "destination"
-        mocker.patch("bootprocess.general.emailSES", return_value=True)
+        mocker.patch("Access.models.OutboundNotification.enqueue", return_value=True)
         views_helper.all_access_modules = [mockAccessModule1]
 
     elif testName == test_run_access_grant_approveException:
@@ -302,7 +301,7 @@ def test_run_access_grant(
         mockAccessModule1.approve.return_value = True
         mockAccessModule1.approve.side_effect = Exception("Approve Exception")
         mockAccessModule1.access_mark_revoke_permission.return_value = "destination"
-        mocker.patch("bootprocess.general.emailSES", return_value=True)
+        mocker.patch("Access.models.OutboundNotification.enqueue", return_value=True)
         views_helper.all_access_modules = [mockAccessModule1]
 
     val = views_helper.run_access_grant(
@@ -312,4 +311,68 @@ def test_run_access_grant(
     assert val == response
     assert requestObject.status == response_status
     if response_status == "GrantFailed":
-        general.emailSES.call_count == 1
+        assert models.OutboundNotification.enqueue.call_count == 1
+
+
+@pytest.mark.parametrize(
+    "testName, isAlreadyMember, groupExists, expectedEnrolled",
+    [
+        ("user is already in the default group", True, True, False),
+        ("default group does not exist", False, False, False),
+        ("new user is added to the default group", False, True, True),
+    ],
+)
+def test_add_user_to_default_access_group(
+    mocker, testName, isAlreadyMember, groupExists, expectedEnrolled
+):
+    user = mocker.MagicMock()
+    user.name = "user"
+    memberships = mocker.MagicMock()
+    memberships.exists.return_value = isAlreadyMember
+    mocker.patch("Access.models.MembershipV2.objects.filter", return_value=memberships)
+    mocker.patch("Access.models.MembershipV2.objects.create")
+    groups = mocker.MagicMock()
+    groups.first.return_value = mocker.MagicMock() if groupExists else None
+    mocker.patch("Access.models.GroupV2.objects.filter", return_value=groups)
+    mocker.patch("django.db.transaction.atomic")
+    mocker.patch("Access.views_helper.generate_user_mappings", return_value=[])
+    mocker.patch("Access.views_helper.execute_group_access")
+
+    assert views_helper.add_user_to_default_access_group(user) == expectedEnrolled
+
+    createCount = 1 if expectedEnrolled else 0
+    assert models.MembershipV2.objects.create.call_count == createCount
+    assert views_helper.execute_group_access.call_count == createCount
+
+
+@pytest.mark.django_db
+def test_enroll_users_missing_from_default_access_group(mocker):
+    from django.contrib.auth.models import User as django_user
+
+    mocker.patch("Access.background_task_manager.background_task")
+    owner = django_user.objects.create(username="owner").user
+    group = models.GroupV2.objects.create(
+        group_id="default-group",
+        name=views_helper.DEFAULT_ACCESS_GROUP,
+        requester=owner,
+        status="Approved",
+    )
+    models.MembershipV2.objects.create(
+        membership_id="owner-membership",
+        user=owner,
+        group=group,
+        is_owner=True,
+        requested_by=owner,
+        status="Approved",
+    )
+    missing_user = django_user.objects.create(username="missing").user
+    offboarded_user = django_user.objects.create(username="offboarded").user
+    offboarded_user.state = "3"
+    offboarded_user.save()
+    add_user = mocker.patch(
+        "Access.views_helper.add_user_to_default_access_group", return_value=True
+    )
+
+    assert views_helper.enroll_users_missing_from_default_access_group() == 1
+
+    add_user.assert_called_once_with(missing_user)
@@ -327,3 +327,58 @@ def test_PendingRevokeRequests(
 
     context = accessrequest_helper.get_pending_revoke_failures(request)
     assert str(context) == expectedOutPut
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("labelCount", [1, 40])
+def test_create_request_batches_queries(
+    mocker, django_assert_num_queries, labelCount
+):
+    import json
+    from django.contrib.auth.models import User as django_user
+    from Access import models
+
+    auth_user = django_user.objects.create(username="user1", email="user1@example.com")
+    user_identity = auth_user.user.create_new_identity(
+        access_tag="github", identity={"username": "u1"}
+    )
+    # an access requested before and one existing access not requested yet
+    user_identity.create_access_mapping(
+        request_id="old",
+        access=models.AccessV2.objects.create(
+            access_tag="github", access_label={"repo": "repo0"}
+        ),
+        approver_1=None,
+        approver_2=None,
+        reason="old",
+    )
+    models.AccessV2.objects.create(access_tag="github", access_label={"repo": "repo1"})
+
+    access_labels = [{"repo": "repo%s" % index} for index in range(labelCount + 2)]
+    access_module = mocker.MagicMock()
+    access_module.validate_request.side_effect = lambda labels, *args, **kwargs: labels
+    access_module.get_extra_fields.return_value = []
+    access_module.can_auto_approve.return_value = False
+    mocker.patch(
+        "Access.helpers.get_available_access_module_from_tag",
+        return_value=access_module,
+    )
+    form = QueryDict(mutable=True)
+    form.setlist("accessRequests", ["github", "ssh"])
+    form.setlist(
+        "accessLabel", [json.dumps(access_labels), json.dumps([{"host": "h1"}])]
+    )
+    form.setlist("accessReason", ["repos", "host"])
+
+    with django_assert_num_queries(7):
+        response = accessrequest_helper.create_request(auth_user, form)
+
+    statuses = [status["title"] for status in response["status_list"]]
+    assert statuses[0] == "github: Duplicate Request not submitted"
+    assert all(status.endswith("Request Submitted") for status in statuses[1:-1])
+    assert statuses[-1] == "Identity not setup"
+    assert sorted(
+        user_identity.user_access_mapping.values_list("access__access_label", flat=True),
+        key=lambda access_label: int(access_label["repo"][4:]),
+    ) == access_labels
+    assert models.AccessV2.objects.count() == labelCount + 2
@@ -0,0 +1,170 @@
+import pytest
+from Access.base_email_access import access
+from Access.base_email_access.access import BaseEmailAccess
+from Access import background_task_manager
+
+
+class MockEmailAccess(BaseEmailAccess):
+    def tag(self):
+        return "email_module"
+
+    def access_desc(self):
+        return "Email Module"
+
+    def access_types(self):
+        return [{"type": "read", "desc": "Read"}]
+
+    def email_targets(self, user):
+        return ["owner@example.com"]
+
+
+@pytest.mark.parametrize(
+    "testName, digestMode, isFirstEntry",
+    [
+        ("digest mode is off", False, False),
+        ("first grant of the digest", True, True),
+        ("grant added to a waiting digest", True, False),
+    ],
+)
+def test_approve(mocker, testName, digestMode, isFirstEntry):
+    mocker.patch("Access.base_email_access.access.send_emails", return_value=True)
+    mocker.patch(
+        "Access.models.AccessGrantDigestEntry.add",
+        return_value=("digest_key", isFirstEntry),
+    )
+    mocker.patch("Access.background_task_manager.schedule_access_grant_digest")
+
+    access_module = MockEmailAccess()
+    access_module.digest_mode = digestMode
+    user_identity = mocker.MagicMock()
+    request = mocker.MagicMock()
+
+    response = access_module.approve(
+        user_identity=user_identity,
+        labels=[{"data": "read"}],
+        approver="approver@example.com",
+        request=request,
+    )
+
+    assert response == (True, "")
+    if digestMode:
+        assert access.send_emails.call_count == 0
+        assert access.AccessGrantDigestEntry.add.call_count == 1
+        assert background_task_manager.schedule_access_grant_digest.call_count == (
+            1 if isFirstEntry else 0
+        )
+    else:
+        assert access.send_emails.call_count == 1
+        assert access.AccessGrantDigestEntry.add.call_count == 0
+
+
+@pytest.mark.parametrize(
+    "testName, sendFails",
+    [
+        ("digest is sent", False),
+        ("digest could not be sent", True),
+    ],
+)
+def test_send_access_grant_digest(mocker, testName, sendFails):
+    entry = mocker.MagicMock()
+    entry.id = 1
+    entry.access_tag = "email_module"
+    entry.email_targets = ["owner@example.com"]
+    mocker.patch(
+        "Access.models.AccessGrantDigestEntry.claim_pending_entries",
+        return_value=[entry],
+    )
+    mocker.patch("Access.models.AccessGrantDigestEntry.mark_sent")
+    mocker.patch("Access.models.AccessGrantDigestEntry.mark_failed")
+
+    access_module = mocker.MagicMock()
+    if sendFails:
+        access_module.send_digest.side_effect = Exception("SMTP error")
+    mocker.patch(
+        "Access.helpers.get_available_access_module_from_tag",
+        return_value=access_module,
+    )
+
+    result = background_task_manager.send_access_grant_digest("digest_key")
+
+    digest_entry = background_task_manager.AccessGrantDigestEntry
+    assert result != sendFails
+    assert access_module.send_digest.call_count == 1
+    assert digest_entry.mark_sent.call_count == (0 if sendFails else 1)
+    assert digest_entry.mark_failed.call_count == (1 if sendFails else 0)
+
+
+@pytest.mark.parametrize(
+    "testName, minutesSinceFirstGrant, expectedSent",
+    [
+        ("digest still waiting for its scheduled send", 6, False),
+        ("digest whose scheduled send was lost", 11, True),
+    ],
+)
+def test_send_due_access_grant_digests(
+    mocker, testName, minutesSinceFirstGrant, expectedSent
+):
+    import datetime
+    from django.utils import timezone
+
+    mocker.patch(
+        "Access.models.AccessGrantDigestEntry.get_pending_digests",
+        return_value=[
+            {
+                "digest_key": "digest_key",
+                "access_tag": "email_module",
+                "first_created_on": timezone.now()
+                - datetime.timedelta(minutes=minutesSinceFirstGrant),
+            }
+        ],
+    )
+    mocker.patch(
+        "Access.helpers.get_available_access_module_from_tag",
+        return_value=mocker.MagicMock(digest_window_seconds=300),
+    )
+    mocker.patch("Access.models.AccessGrantDigestEntry.release_expired_claims")
+    send_digest = mocker.patch(
+        "Access.background_task_manager.send_access_grant_digest"
+    )
+
+    assert background_task_manager.send_due_access_grant_digests()
+
+    assert send_digest.call_count == (1 if expectedSent else 0)
+
+
+@pytest.mark.django_db
+def test_access_grant_digest_is_scheduled_and_claimed_once():
+    from django.contrib.auth.models import User as django_user
+    from django.core.cache import cache
+    from Access import models
+
+    cache.clear()
+    user_identity = django_user.objects.create(
+        username="user1", email="user1@example.com"
+    ).user.create_new_identity(access_tag="email_module", identity={})
+    is_first_entries = []
+    for index in range(2):
+        request = user_identity.create_access_mapping(
+            request_id="request%s" % index,
+            access=models.AccessV2.objects.create(
+                access_tag="email_module", access_label={"data": index}
+            ),
+            approver_1=None,
+            approver_2=None,
+            reason="reason",
+        )
+        digest_key, is_first_entry = models.AccessGrantDigestEntry.add(
+            access_tag="email_module",
+            email_targets=["owner@example.com"],
+            user_access_mapping=request,
+            label_desc="read",
+            approver="approver@example.com",
+        )
+        is_first_entries.append(is_first_entry)
+
+    assert is_first_entries == [True, False]
+    claimed_entries = models.AccessGrantDigestEntry.claim_pending_entries(digest_key)
+    assert len(claimed_entries) == 2
+    # an overlapping sweep or duplicate scheduled send finds nothing to send
+    assert models.AccessGrantDigestEntry.claim_pending_entries(digest_key) == []
+    assert models.AccessGrantDigestEntry.release_expired_claims() == 0
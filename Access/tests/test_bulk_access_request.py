@@ -0,0 +1,161 @@
+import json
+from io import StringIO
+
+import pytest
+from django.contrib.auth.models import User as django_user
+from django.core.management import call_command
+
+from Access import bulk_access_request, models
+
+
+@pytest.fixture
+def access_modules(mocker):
+    def validate_request(access_labels, request_user, is_group=False):
+        if access_labels == ["invalid"]:
+            raise Exception("Invalid repo")
+        return [{"repo": access_label} for access_label in access_labels]
+
+    modules = {}
+    for access_tag, can_auto_approve in [("github", False), ("confluence", True)]:
+        modules[access_tag] = mocker.MagicMock()
+        modules[access_tag].validate_request.side_effect = validate_request
+        modules[access_tag].can_auto_approve.return_value = can_auto_approve
+    mocker.patch(
+        "Access.helpers.get_available_access_module_from_tag",
+        side_effect=modules.get,
+    )
+    return modules
+
+
+def _create_users(count):
+    users = []
+    for index in range(count):
+        user = django_user.objects.create(
+            username="user%s" % index, email="user%s@example.com" % index
+        ).user
+        user.create_new_identity(access_tag="github", identity={"username": index})
+        user.create_new_identity(access_tag="confluence", identity={})
+        users.append(user)
+    return users
+
+
+@pytest.mark.django_db
+def test_create_bulk_access_requests(
+    mocker, access_modules, django_capture_on_commit_callbacks
+):
+    requester = django_user.objects.create(username="ops", email="ops@example.com").user
+    users = _create_users(20)
+    background_task = mocker.patch("Access.background_task_manager.background_task")
+    items = [
+        {
+            "email": user.email,
+            "accessTag": access_tag,
+            "accessLabels": ["repo1", "repo2"],
+            "reason": "onboarding",
+        }
+        for user in users
+        for access_tag in ["github", "confluence"]
+    ]
+    items += [
+        {"email": "user0@example.com", "accessTag": "github"},
+        {
+            "email": "unknown@example.com",
+            "accessTag": "github",
+            "accessLabels": ["repo1"],
+            "reason": "onboarding",
+        },
+        {
+            "email": "user0@example.com",
+            "accessTag": "github",
+            "accessLabels": ["invalid"],
+            "reason": "onboarding",
+        },
+        {
+            "email": "user0@example.com",
+            "accessTag": "github",
+            "accessLabels": ["repo1"],
+            "reason": "onboarding again",
+        },
+    ]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        reports = bulk_access_request.create_bulk_access_requests(
+            requester, items, auto_approve=True
+        )
+
+    statuses = {report["index"]: report["status"] for report in reports}
+    assert [report["index"] for report in reports] == list(range(len(items)))
+    assert [statuses[index] for index in range(4)] == [
+        "pending", "approved", "pending", "approved"
+    ]
+    assert [statuses[index] for index in range(40, 44)] == ["error"] * 4
+    assert reports[-1]["msg"].startswith("Access already granted or request in pending")
+    assert models.UserAccessMapping.objects.filter(status="Pending").count() == 40
+    assert models.UserAccessMapping.objects.filter(
+        status="Processing", approver_1=requester
+    ).count() == 40
+    background_task.assert_called_once_with(
+        "run_access_grant_batch", mocker.ANY
+    )
+    assert len(background_task.call_args.args[1]) == 40
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("userCount", [1, 20])
+def test_create_bulk_access_requests_queries(
+    access_modules, django_assert_num_queries, userCount
+):
+    requester = django_user.objects.create(username="ops", email="ops@example.com").user
+    items = [
+        {
+            "email": user.email,
+            "accessTag": "github",
+            "accessLabels": ["repo1", "repo2"],
+            "reason": "onboarding",
+        }
+        for user in _create_users(userCount)
+    ]
+
+    # users, identities, existing accesses and both inserts in a transaction
+    with django_assert_num_queries(7):
+        bulk_access_request.create_bulk_access_requests(requester, items)
+
+
+def test_create_bulk_access_requests_rejects_too_many_items():
+    with pytest.raises(bulk_access_request.BulkAccessRequestException):
+        bulk_access_request.create_bulk_access_requests(
+            None, [{}] * (bulk_access_request.BULK_ACCESS_REQUEST_MAX_ITEMS + 1)
+        )
+
+
+@pytest.mark.django_db
+def test_bulk_request_access_command(access_modules, tmp_path):
+    django_user.objects.create(username="ops", email="ops@example.com")
+    _create_users(1)
+    requests_file = tmp_path / "requests.json"
+    requests_file.write_text(
+        json.dumps(
+            [
+                {
+                    "email": "user0@example.com",
+                    "accessTag": "github",
+                    "accessLabels": ["repo1"],
+                    "reason": "onboarding",
+                }
+            ]
+        )
+    )
+    stdout = StringIO()
+
+    call_command(
+        "bulk_request_access",
+        str(requests_file),
+        requester="ops@example.com",
+        stdout=stdout,
+    )
+
+    report = json.loads(stdout.getvalue())
+    assert report["status"] == "pending"
+    assert report["requestIds"] == [
+        models.UserAccessMapping.objects.get().request_id
+    ]
@@ -0,0 +1,63 @@
+import pytest
+from django.core.cache import cache
+
+from Access import context_processors
+
+
+@pytest.fixture
+def request_object(mocker):
+    cache.clear()
+    request = mocker.MagicMock()
+    request.headers = {"Content-Type": "text/html"}
+    request.user.is_authenticated = True
+    request.user.user.id = 1
+    request.user.user.getFailedGrantsCount.return_value = 3
+    request.user.user.getPendingApprovalsCount.return_value = 2
+    request.user.user.permissions = [mocker.MagicMock(label="ACCESS_APPROVE")]
+    return request
+
+
+def test_add_variables_to_context_skips_api_requests(request_object):
+    request_object.headers = {"Content-Type": "application/json"}
+
+    assert context_processors.add_variables_to_context(request_object) == {}
+
+
+def test_add_variables_to_context_is_lazy_and_cached(request_object):
+    current_user = request_object.user.user
+
+    context = context_processors.add_variables_to_context(request_object)
+    assert current_user.getFailedGrantsCount.call_count == 0
+    assert current_user.getPendingApprovalsCount.call_count == 0
+
+    assert int(str(context["grantFailureCount"])) == 3
+    context = context_processors.add_variables_to_context(request_object)
+    assert int(str(context["grantFailureCount"])) == 3
+    assert current_user.getFailedGrantsCount.call_count == 1
+
+    # saving an access request makes the cached count stale
+    context_processors.invalidate_context_data("failures")
+    context = context_processors.add_variables_to_context(request_object)
+    assert int(str(context["grantFailureCount"])) == 3
+    assert current_user.getFailedGrantsCount.call_count == 2
+    assert current_user.getPendingApprovalsCount.call_count == 0
+
+
+@pytest.mark.parametrize(
+    ["permission_label", "expected_call_count"],
+    [("ACCESS_APPROVE", 2), ("OTHER_APPROVE", 1)],
+)
+def test_pending_count_is_stale_for_approvers_only(
+    request_object, permission_label, expected_call_count
+):
+    current_user = request_object.user.user
+
+    for _ in range(2):
+        context = context_processors.add_variables_to_context(request_object)
+        assert int(str(context["pendingCount"])) == 2
+    assert current_user.getPendingApprovalsCount.call_count == 1
+
+    context_processors.invalidate_context_data("approver", permission_label)
+    context = context_processors.add_variables_to_context(request_object)
+    assert int(str(context["pendingCount"])) == 2
+    assert current_user.getPendingApprovalsCount.call_count == expected_call_count
@@ -0,0 +1,153 @@
+import json
+
+import pytest
+from django.contrib.auth.models import User as django_user
+from django.core.cache import cache
+
+from Access import group_access_list, models
+
+
+def test_get_group_access_list_json_is_cached_until_invalidated(mocker):
+    cache.clear()
+    group = mocker.MagicMock(id=1)
+    get_members = mocker.patch(
+        "Access.group_access_list.get_group_members",
+        return_value=[{"email": "member@example.com"}],
+    )
+    mocker.patch(
+        "Access.group_access_list.get_group_generic_accesses", return_value=[]
+    )
+
+    data = json.loads(group_access_list.get_group_access_list_json(group))
+    group_access_list.get_group_access_list_json(group)
+    assert data == {"userList": [{"email": "member@example.com"}], "genericAccesses": []}
+    assert get_members.call_count == 1
+
+    # a membership of the group changed
+    group_access_list.invalidate_group_access_list_on_change(
+        sender=None, instance=mocker.MagicMock(group_id=1)
+    )
+    group_access_list.get_group_access_list_json(group)
+    assert get_members.call_count == 2
+
+
+def test_get_group_generic_accesses_looks_up_each_module_once(mocker):
+    group = mocker.MagicMock()
+    group_mappings = []
+    for access_tag in ["aws", "aws", "removed_module"]:
+        group_mapping = mocker.MagicMock()
+        group_mapping.access.access_tag = access_tag
+        group_mapping.getAccessRequestDetails.return_value = {"access_tag": access_tag}
+        group_mappings.append(group_mapping)
+    group.get_active_accesses.return_value.select_related.return_value = (
+        group_mappings
+    )
+    aws_module = mocker.MagicMock()
+    get_module = mocker.patch(
+        "Access.helpers.get_available_access_module_from_tag",
+        side_effect=lambda access_tag: aws_module if access_tag == "aws" else None,
+    )
+
+    generic_accesses = group_access_list.get_group_generic_accesses(group)
+
+    assert generic_accesses == [{"access_tag": "aws"}, {"access_tag": "aws"}]
+    assert get_module.call_count == 2
+    group_mappings[0].getAccessRequestDetails.assert_called_once_with(aws_module)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "isOwner, canOffboard",
+    [(True, False), (False, True), (False, False)],
+)
+def test_get_group_with_user_permissions(
+    django_assert_num_queries, isOwner, canOffboard
+):
+    user = django_user.objects.create(username="user1", email="user1@example.com").user
+    group = models.GroupV2.objects.create(
+        group_id="group1",
+        name="group1",
+        description="group",
+        requester=user,
+        status="Approved",
+    )
+    models.MembershipV2.objects.create(
+        membership_id="membership1",
+        user=user,
+        group=group,
+        is_owner=isOwner,
+        requested_by=user,
+        status="Approved",
+    )
+    if canOffboard:
+        role = models.Role.objects.create(label="offboarder")
+        role.permission.add(
+            models.Permission.objects.create(label="ALLOW_USER_OFFBOARD")
+        )
+        user.role.add(role)
+
+    with django_assert_num_queries(1):
+        group_with_permissions = group_access_list.get_group_with_user_permissions(
+            "group1", user
+        )
+
+    assert group_with_permissions == group
+    assert group_with_permissions.user_is_owner == isOwner
+    assert group_with_permissions.user_can_offboard == canOffboard
+
+
+@pytest.mark.django_db
+def test_invalidate_group_access_lists_of_user_on_displayed_fields(mocker):
+    django_access_user = django_user.objects.create(
+        username="user2", email="user2@example.com", first_name="User Two"
+    )
+    user = django_access_user.user
+    invalidate = mocker.patch(
+        "Access.group_access_list.invalidate_group_access_list"
+    )
+    models.MembershipV2.objects.create(
+        membership_id="membership2",
+        user=user,
+        group=models.GroupV2.objects.create(
+            group_id="group2", name="group2", description="group", requester=user
+        ),
+        requested_by=user,
+        status="Approved",
+    )
+    invalidate.reset_mock()
+
+    # a login saves the django user without changing the user
+    django_access_user.last_login = django_access_user.date_joined
+    django_access_user.save()
+    user.avatar = "avatar"
+    user.save(update_fields=["avatar"])
+    assert invalidate.call_count == 0
+
+    user.state = "2"
+    user.save(update_fields=["state"])
+    invalidate.assert_called_once_with(user.membership_user.get().group_id)
+
+
+@pytest.mark.django_db
+def test_membership_bulk_updates_invalidate_group_access_lists(mocker):
+    user = django_user.objects.create(username="user3", email="user3@example.com").user
+    group = models.GroupV2.objects.create(
+        group_id="group3", name="group3", description="group", requester=user
+    )
+    models.MembershipV2.objects.create(
+        membership_id="membership3",
+        user=user,
+        group=group,
+        requested_by=user,
+        status="Pending",
+    )
+    invalidate = mocker.patch(
+        "Access.group_access_list.invalidate_group_access_list"
+    )
+
+    group.approve_all_pending_users(approved_by=user)
+    group.unapprove_memberships()
+    user.revoke_all_memberships()
+    models.MembershipV2.update_membership(group, "declined")
+
+    assert invalidate.call_args_list == [mocker.call(group.id)] * 4
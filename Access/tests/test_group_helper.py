@@ -2,7 +2,7 @@ import pytest
 from django.http import QueryDict
 from Access import models, helpers
 from Access import group_helper
-from bootprocess import general
+from django.contrib.auth.models import User as django_user
 
 testGroupName = "testgroupname"
 # TESTCASE NAMES
@@ -107,7 +107,7 @@ def test_approve_new_group_request(
         mocker.patch(
             "Access.helpers.generateStringFromTemplate", return_value="email body"
         )
-        mocker.patch("bootprocess.general.emailSES", return_value=True)
+        mocker.patch("Access.models.OutboundNotification.enqueue", return_value=True)
 
     elif testname == test_approve_new_group_request_ThrowsException:
         request.user.username = "username1"
@@ -131,7 +131,7 @@ def test_approve_new_group_request(
             "Access.helpers.generateStringFromTemplate", return_value="email body"
         )
         mocker.patch(
-            "bootprocess.general.emailSES",
+            "Access.models.OutboundNotification.enqueue",
             return_value=True,
             side_effect=Exception("sendEmailError"),
         )
@@ -143,7 +143,7 @@ def test_approve_new_group_request(
     assert models.GroupV2.objects.get.call_count == 1
 
     if testname != test_approve_new_group_request_ProcessReq and requestApproved:
-        assert general.emailSES.call_count == 1
+        assert models.OutboundNotification.enqueue.call_count == 1
         assert models.MembershipV2.objects.filter.call_count == 2
         assert helpers.generateStringFromTemplate.call_count == 2
 
@@ -448,3 +448,243 @@ def test_add_user_to_group(mocker, test_name, post_data, expected_output):
 
     context = group_helper.add_user_to_group(request)
     assert expected_output in str(context)
+
+
+def test_remove_member(mocker):
+    request = mocker.MagicMock()
+    request.POST = QueryDict("membershipId=membership1")
+    auth_user = mocker.MagicMock()
+    auth_user.user.is_allowed_admin_actions_on_group.return_value = True
+    membership = mocker.MagicMock()
+    mocker.patch(
+        "Access.models.MembershipV2.get_membership", return_value=membership
+    )
+
+    pending_mapping = mocker.MagicMock(id=1, request_id="req1", status="Pending")
+    approved_mapping = mocker.MagicMock(id=2, request_id="req2", status="Approved")
+    only_through_group = mocker.patch(
+        "Access.group_helper.get_user_access_mappings_only_through_group"
+    )
+    only_through_group.return_value.filter.return_value.only.return_value = [
+        pending_mapping,
+        approved_mapping,
+    ]
+    user_access_mapping_filter = mocker.patch(
+        "Access.group_helper.UserAccessMapping.objects.filter"
+    )
+    revoke_requests = mocker.patch("Access.group_helper.revoke_requests")
+    mocker.patch("django.db.transaction.atomic")
+
+    response = group_helper.remove_member(request, auth_user)
+
+    assert response == {"message": "Successfully removed user from group"}
+    only_through_group.assert_called_once_with(membership.user, membership.group)
+    user_access_mapping_filter.assert_called_once_with(id__in=[1])
+    user_access_mapping_filter.return_value.update.assert_called_once_with(
+        status="Declined", decline_reason="User removed from the group"
+    )
+    revoke_requests.assert_called_once_with([approved_mapping], request.user.user)
+    membership.revoke_membership.assert_called_once_with()
+
+
+def test_get_user_access_mappings_only_through_group():
+    user = models.User(id=1)
+    group = models.GroupV2(id=2)
+
+    queryset = group_helper.get_user_access_mappings_only_through_group(user, group)
+
+    # one statement: the group's accesses minus other groups' and individual ones
+    sql = str(queryset.query)
+    assert sql.count("SELECT") == 4
+    assert sql.count('NOT ("Access_useraccessmapping"."access_id" IN (SELECT') == 2
+
+
+def test_revoke_access_from_group(mocker):
+    request = mocker.MagicMock()
+    request.POST = QueryDict("request_id=groupRequest1")
+    request.user.user.has_permission.return_value = True
+    group_access_mapping = mocker.MagicMock()
+    mocker.patch(
+        "Access.models.GroupAccessMapping.get_by_id",
+        return_value=group_access_mapping,
+    )
+
+    failed_mapping = mocker.MagicMock(id=1, request_id="req1", status="GrantFailed")
+    approved_mapping = mocker.MagicMock(id=2, request_id="req2", status="Approved")
+    not_in_other_groups = mocker.patch(
+        "Access.group_helper.get_member_access_mappings_not_in_other_groups"
+    )
+    not_in_other_groups.return_value.filter.return_value.only.return_value = [
+        failed_mapping,
+        approved_mapping,
+    ]
+    user_access_mapping_filter = mocker.patch(
+        "Access.group_helper.UserAccessMapping.objects.filter"
+    )
+    revoke_requests = mocker.patch("Access.group_helper.revoke_requests")
+    mocker.patch("django.db.transaction.atomic")
+
+    response = group_helper.revoke_access_from_group(request)
+
+    assert response == {"message": "Successfully initiated the revoke"}
+    not_in_other_groups.assert_called_once_with(
+        group_access_mapping.group, group_access_mapping.access
+    )
+    user_access_mapping_filter.assert_called_once_with(id__in=[1])
+    revoke_requests.assert_called_once_with([approved_mapping], request.user.user)
+    group_access_mapping.mark_revoked.assert_called_once_with(request.user.user)
+
+
+def _create_group_with_members(member_count):
+    requester = models.User.objects.get(
+        user=django_user.objects.create(username="owner", email="owner@example.com")
+    )
+    group = models.GroupV2.objects.create(
+        group_id="group1",
+        name="group1",
+        description="group",
+        requester=requester,
+        status="Approved",
+    )
+    models.MembershipV2.objects.create(
+        membership_id="membership0",
+        user=requester,
+        group=group,
+        is_owner=True,
+        requested_by=requester,
+        status="Approved",
+    )
+    for index in range(1, member_count + 1):
+        member = django_user.objects.create(
+            username="member%s" % index, email="member%s@example.com" % index
+        )
+        models.MembershipV2.objects.create(
+            membership_id="membership%s" % index,
+            user=member.user,
+            group=group,
+            is_owner=index == 1,
+            requested_by=requester,
+            status="Approved",
+        )
+    return requester
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("memberCount", [3, 30])
+@pytest.mark.parametrize(
+    "owners, expectedOwnerEmails, expectedNotification",
+    [
+        # member1 is replaced by member2 as owner
+        (["member2@example.com"], ["member2@example.com"], True),
+        # nothing changed, no mail is sent
+        (["member1@example.com"], ["member1@example.com"], False),
+    ],
+)
+def test_update_owners(
+    mocker,
+    django_assert_num_queries,
+    memberCount,
+    owners,
+    expectedOwnerEmails,
+    expectedNotification,
+):
+    requester = _create_group_with_members(memberCount)
+    request = mocker.MagicMock()
+    request.user.user = requester
+    request.POST = QueryDict(mutable=True)
+    request.POST.setlist("owners", owners)
+    send_mail = mocker.patch("Access.notifications.send_group_owners_update_mail")
+
+    # group lookup, savepoint, two updates, savepoint release and the owner
+    # emails when something changed, whatever the size of the group
+    with django_assert_num_queries(6 if expectedNotification else 5):
+        context = group_helper.update_owners(request, "group1")
+
+    assert "error" not in context
+    assert sorted(
+        models.MembershipV2.objects.filter(is_owner=True)
+        .exclude(user=requester)
+        .values_list("user__email", flat=True)
+    ) == expectedOwnerEmails
+    assert send_mail.called == expectedNotification
+
+
+@pytest.mark.django_db
+def test_add_members(django_assert_num_queries):
+    requester = _create_group_with_members(2)
+    group = models.GroupV2.objects.get(name="group1")
+    new_users = [
+        django_user.objects.create(
+            username="new%s" % index, email="new%s@example.com" % index
+        ).user
+        for index in range(50)
+    ]
+    existing_member = models.User.objects.get(email="member1@example.com")
+
+    # savepoint, group lock, duplicate check, insert, savepoint release and
+    # read back, whatever the number of users
+    with django_assert_num_queries(6):
+        memberships, skipped_users = group.add_members(
+            users=[existing_member] + new_users,
+            requested_by=requester,
+            reason="project members",
+            date_time="20230101000000",
+        )
+
+    assert skipped_users == [existing_member]
+    assert sorted(membership.user.email for membership in memberships) == sorted(
+        user.email for user in new_users
+    )
+    assert len({membership.membership_id for membership in memberships}) == 50
+    assert all(membership.status == "Pending" for membership in memberships)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "selectedEmails, expectedContext",
+    [
+        (
+            ["member1@example.com"],
+            {
+                "error": {
+                    "error_msg": "Duplicate Request",
+                    "msg": group_helper.DUPLICATE_GROUP_MEMBER_ADD_REQUEST.format(
+                        user_emails="member1@example.com"
+                    ),
+                }
+            },
+        ),
+        (
+            ["member1@example.com", "new@example.com"],
+            {
+                "status": {
+                    "title": group_helper.ALL_USERS_NOT_ADDED["title"],
+                    "msg": group_helper.ALL_USERS_NOT_ADDED["msg"].format(
+                        users_not_added="member1@example.com",
+                        users_added="new@example.com",
+                    ),
+                }
+            },
+        ),
+    ],
+)
+def test_add_user_to_group_reports_skipped_members(
+    mocker, selectedEmails, expectedContext
+):
+    requester = _create_group_with_members(1)
+    django_user.objects.create(username="new", email="new@example.com")
+    request = mocker.MagicMock()
+    request.user.user = requester
+    request.POST = QueryDict(mutable=True)
+    request.POST["groupName"] = "group1"
+    request.POST["memberReason"] = "project member"
+    request.POST.setlist("selectedUserList", selectedEmails)
+    send_mail = mocker.patch("Access.notifications.send_mail_for_member_approval")
+
+    context = group_helper.add_user_to_group(request)
+
+    assert context == expectedContext
+    assert send_mail.called == ("new@example.com" in selectedEmails)
+    assert models.MembershipV2.objects.filter(
+        user__email="new@example.com", status="Pending"
+    ).count() == ("new@example.com" in selectedEmails)
@@ -0,0 +1,50 @@
+import json
+import os
+
+from Access.instance_types import InstanceTypeCatalog
+from scripts import config_loader
+
+
+def _write_instance_types(path, regions, mtime):
+    path.write_text(json.dumps(regions))
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_instance_type_catalog(mocker, tmp_path):
+    mocker.patch.object(config_loader, "config_files", {})
+    instance_types_path = tmp_path / "instanceTypes.json"
+    _write_instance_types(
+        instance_types_path,
+        {
+            "eu-central-1": {
+                "instanceTypes": [{"type": "t3.nano", "dispName": "General nano"}]
+            }
+        },
+        1000000000,
+    )
+    catalog = InstanceTypeCatalog(str(instance_types_path))
+    json_load = mocker.spy(json, "load")
+
+    assert catalog.get_regions() == ("eu-central-1",)
+    assert dict(catalog.get_instance_types("eu-central-1")) == {
+        "t3.nano": "General nano"
+    }
+    assert catalog.get_instance_type_display_name("eu-central-1", "t3.nano") == (
+        "General nano"
+    )
+    assert catalog.get_instance_type_display_name("us-east-1", "t3.nano") is None
+    assert json_load.call_count == 1
+    # lookups are built once per load of the file
+    assert catalog.get_instance_types("eu-central-1") is catalog.get_instance_types(
+        "eu-central-1"
+    )
+
+    _write_instance_types(
+        instance_types_path,
+        {"us-east-1": {"instanceTypes": [{"type": "m5.large", "dispName": "M5"}]}},
+        2000000000,
+    )
+
+    assert catalog.get_regions() == ("us-east-1",)
+    assert catalog.get_instance_type_display_name("us-east-1", "m5.large") == "M5"
+    assert json_load.call_count == 2
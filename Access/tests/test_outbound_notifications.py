@@ -0,0 +1,85 @@
+import pytest
+from Access import background_task_manager
+from Access.models import OutboundNotification
+
+
+@pytest.mark.parametrize(
+    "testName, sendFails, attempts, expectedStatus, expectedRetryCount",
+    [
+        ("notification is sent", False, 0, "Sent", 0),
+        ("failed notification is retried", True, 0, "Pending", 1),
+        ("notification out of attempts", True, 4, "Failed", 0),
+    ],
+)
+def test_send_outbound_notifications(
+    mocker, testName, sendFails, attempts, expectedStatus, expectedRetryCount
+):
+    outbound_notification = OutboundNotification(
+        id=1,
+        destination=["user@example.com"],
+        subject="subject",
+        body="body",
+        attempts=attempts,
+    )
+    mocker.patch.object(outbound_notification, "save")
+    mocker.patch(
+        "Access.models.OutboundNotification.claim_due_notifications",
+        return_value=[outbound_notification],
+    )
+    send_emails = mocker.patch("bootprocess.general.send_emails", return_value=True)
+    if sendFails:
+        send_emails.side_effect = Exception("SMTP error")
+    mocker.patch("Access.background_task_manager.schedule_outbound_notifications")
+
+    assert background_task_manager.send_outbound_notifications()
+
+    assert send_emails.call_count == 1
+    assert outbound_notification.status == expectedStatus
+    assert outbound_notification.attempts == attempts + 1
+    assert (
+        background_task_manager.schedule_outbound_notifications.call_count
+        == expectedRetryCount
+    )
+
+
+def test_enqueue_rejects_invalid_notification(mocker):
+    mocker.patch("Access.models.OutboundNotification.objects")
+
+    with pytest.raises(Exception):
+        OutboundNotification.enqueue(["user@example.com"], "subject", "")
+
+    assert OutboundNotification.objects.create.call_count == 0
+
+
+@pytest.mark.django_db
+def test_enqueue_schedules_one_send_per_transaction(
+    mocker, django_capture_on_commit_callbacks
+):
+    import threading
+    from django.db import transaction
+
+    # ids are reused once the test database rolls back
+    mocker.patch("Access.models._scheduled_sends", threading.local())
+    schedule_send = mocker.patch(
+        "Access.background_task_manager.schedule_outbound_notifications"
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        for index in range(3):
+            OutboundNotification.enqueue(
+                ["user%s@example.com" % index], "subject", "body"
+            )
+        try:
+            with transaction.atomic():
+                OutboundNotification.enqueue(["user@example.com"], "subject", "body")
+                raise Exception("rolled back")
+        except Exception:
+            pass
+
+    assert schedule_send.call_count == 1
+    assert OutboundNotification.objects.count() == 3
+
+    # a later commit schedules its own send
+    with django_capture_on_commit_callbacks(execute=True):
+        OutboundNotification.enqueue(["user@example.com"], "subject", "body")
+    assert schedule_send.call_count == 2
@@ -51,3 +51,51 @@ def test_isAnApprover(
     accessUser = User()
     accessUser.permissions = permissions
     assert accessUser.isAnApprover(approverPermissions) == expectedAnswer
+
+
+@pytest.mark.parametrize(
+    "testName, accessTag, status, expectedFilters",
+    [
+        ("all accesses of the user", None, None, []),
+        (
+            "accesses filtered by tag and status",
+            "aws",
+            "Approved",
+            [{"access__access_tag": "aws"}, {"status": "Approved"}],
+        ),
+    ],
+)
+def test_get_user_access_mappings(mocker, testName, accessTag, status, expectedFilters):
+    objects = mocker.patch("Access.models.UserAccessMapping.objects")
+    mappings = objects.filter.return_value.select_related.return_value.order_by
+    mappings.return_value.filter.return_value = mappings.return_value
+
+    accessUser = User(id=7)
+    accessUser.get_user_access_mappings(access_tag=accessTag, status=status)
+
+    # one joined query across all identities of the user
+    objects.filter.assert_called_once_with(user_identity__user_id=7)
+    mappings.assert_called_once_with("-requested_on", "-id")
+    assert [
+        call.kwargs for call in mappings.return_value.filter.call_args_list
+    ] == expectedFilters
+
+
+def test_get_access_history(mocker):
+    mappings = []
+    for accessTag in ["aws", "github", "aws"]:
+        mapping = Mock()
+        mapping.access.access_tag = accessTag
+        mapping.getAccessRequestDetails.return_value = {"access_tag": accessTag}
+        mappings.append(mapping)
+    mocker.patch(
+        "Access.models.User.get_user_access_mappings", return_value=mappings
+    )
+    allAccessModules = {"aws": Mock(), "github": Mock()}
+
+    history = User().get_access_history(allAccessModules, page=2, page_size=2)
+
+    assert history["dataList"] == [{"access_tag": "aws"}]
+    assert history["current_page"] == 2
+    assert history["last_page"] == 2
+    mappings[2].getAccessRequestDetails.assert_called_once_with(allAccessModules["aws"])
@@ -1,6 +1,8 @@
 import pytest
 from Access.userlist_helper import (
     getallUserList,
+    get_user_directory_page,
+    search_users,
     ERROR_MESSAGE,
     EXCEPTION_USER_UNAUTHORIZED,
 )
@@ -33,40 +35,229 @@ def test_getallUserList(
         request.user = userMock
 
     elif testname == UserIsAuthorized:
-
-        userMock.name = "UserNickName"
-        userMock.user.name = "UserNickName"
-        userMock.user.first_name = "UserFirstName"
-        userMock.user.last_name = "UserLastName"
-        userMock.email = "UserEmail"
-        userMock.user.username = "UserName1"
-        userMock.gitusername = "GitUserName"
-        userMock.offbaord_date = "TodaysDate"
-        userMock.current_state.return_value = "Active"
-        userMock.user.is_active = True
         userMock.user.has_permission.return_value = UserHasOffboardPermission
-
         request.user = userMock
+        request.GET = {}
 
         mocker.patch(
             "Access.helpers.check_user_permissions", return_value=UserHasPermission
         )
-        mocker.patch("Access.models.User.objects.all", return_value=[userMock])
+        objects = mocker.patch("Access.userlist_helper.User.objects")
+        objects.order_by.return_value.values.return_value.__getitem__.return_value = [
+            {
+                "id": 1,
+                "name": "UserNickName",
+                "email": "UserEmail",
+                "state": "1",
+                "offbaord_date": "TodaysDate",
+                "user__first_name": "UserFirstName",
+                "user__last_name": "UserLastName",
+                "user__username": "UserName1",
+                "user__is_active": True,
+            }
+        ]
 
     context = getallUserList(request)
     if expectedError:
         assert context["error"]["msg"] == ERROR_MESSAGE
         assert context["error"]["error_msg"] == EXCEPTION_USER_UNAUTHORIZED
     else:
-        assert context["dataList"][0]["name"] == userMock.name
-        assert context["dataList"][0]["first_name"] == userMock.user.first_name
-        assert context["dataList"][0]["last_name"] == userMock.user.last_name
-        assert context["dataList"][0]["email"] == userMock.email
-        assert context["dataList"][0]["username"] == userMock.user.username
-        assert context["dataList"][0]["offbaord_date"] == userMock.offbaord_date
-        assert context["dataList"][0]["state"] == userMock.current_state()
-        assert context["dataList"][0]["is_active"] == userMock.user.is_active
+        assert context["dataList"] == [
+            {
+                "name": "UserNickName",
+                "first_name": "UserFirstName",
+                "last_name": "UserLastName",
+                "email": "UserEmail",
+                "username": "UserName1",
+                "is_active": True,
+                "offbaord_date": "TodaysDate",
+                "state": "active",
+            }
+        ]
+        assert context["nextCursor"] is None
         if UserHasOffboardPermission:
             assert context["viewDetails"]["numColumns"] == 8
         else:
             assert context["viewDetails"]["numColumns"] == 7
+
+
+def _user_values(email, first_name, last_name):
+    return {
+        "email": email,
+        "name": first_name,
+        "user__first_name": first_name,
+        "user__last_name": last_name,
+    }
+
+
+@pytest.mark.parametrize(
+    "prefix, cachedUsers, expectedEmails, expectedQueried",
+    [
+        # prefix too short to search
+        ("a", None, [], False),
+        # hot prefix served from the cache
+        ("al", [{"email": "cached@example.com", "name": "Cached"}], ["cached@example.com"], False),
+        # email and username matches are merged and ordered by email
+        (" AL ", None, ["alice@example.com", "bob@example.com"], True),
+    ],
+)
+def test_search_users(mocker, prefix, cachedUsers, expectedEmails, expectedQueried):
+    cache = mocker.patch("Access.userlist_helper.cache")
+    cache.get.return_value = cachedUsers
+    objects = mocker.patch("Access.userlist_helper.User.objects")
+    active_users = objects.filter.return_value.order_by.return_value
+    email_matches = mocker.MagicMock()
+    email_matches.values.return_value.__getitem__.return_value = [
+        _user_values("alice@example.com", "Alice", "A"),
+    ]
+    username_matches = mocker.MagicMock()
+    username_matches.values.return_value.__getitem__.return_value = [
+        _user_values("bob@example.com", "Bob", "B"),
+        _user_values("alice@example.com", "Alice", "A"),
+    ]
+    active_users.filter.side_effect = [email_matches, username_matches]
+
+    users = search_users(prefix, limit=10)
+
+    assert [user["email"] for user in users] == expectedEmails
+    assert objects.filter.called == expectedQueried
+    if expectedQueried:
+        active_users.filter.assert_any_call(email__istartswith="al")
+        active_users.filter.assert_any_call(user__username__istartswith="al")
+        assert users[0]["name"] == "Alice A"
+        cache.set.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    "search, state, after, rowCount, expectedFilterCount, expectedNextCursor",
+    [
+        # first page of everyone, more pages to come
+        ("", "", None, 3, 0, 2),
+        # last page of a search within a state
+        ("ali", "1", 5, 2, 3, None),
+    ],
+)
+def test_get_user_directory_page(
+    mocker, search, state, after, rowCount, expectedFilterCount, expectedNextCursor
+):
+    objects = mocker.patch("Access.userlist_helper.User.objects")
+    users = objects.order_by.return_value
+    users.filter.return_value = users
+    users.values.return_value.__getitem__.return_value = [
+        {
+            "id": user_id,
+            "name": "Name",
+            "email": "user%s@example.com" % user_id,
+            "state": "1",
+            "offbaord_date": None,
+            "user__first_name": "First",
+            "user__last_name": "Last",
+            "user__username": "user%s" % user_id,
+            "user__is_active": True,
+        }
+        for user_id in range(1, rowCount + 1)
+    ]
+
+    page = get_user_directory_page(search, state, after, page_size=2)
+
+    objects.order_by.assert_called_once_with("id")
+    users.values.return_value.__getitem__.assert_called_once_with(slice(None, 3))
+    assert users.filter.call_count == expectedFilterCount
+    assert len(page["dataList"]) == 2
+    assert page["nextCursor"] == expectedNextCursor
+
+
+@pytest.mark.django_db
+def test_identity_rotation_moves_accesses_in_bulk(
+    mocker, django_assert_max_num_queries, django_capture_on_commit_callbacks
+):
+    from django.contrib.auth.models import User as django_user
+    from Access import models, userlist_helper
+
+    user = django_user.objects.create(username="user1", email="user1@example.com").user
+    approver = django_user.objects.create(username="approver").user
+    old_identity = user.create_new_identity(
+        access_tag="github", identity={"username": "old"}
+    )
+    for index in range(30):
+        old_identity.create_access_mapping(
+            request_id="old-%s" % index,
+            access=models.AccessV2.objects.create(
+                access_tag="github", access_label={"repo": "repo%s" % index}
+            ),
+            approver_1=approver,
+            approver_2=None,
+            reason="repo access",
+        )
+    old_identity.user_access_mapping.update(status="Approved")
+    background_task = mocker.patch("Access.background_task_manager.background_task")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        # includes creating the system user, none of it is per mapping
+        with django_assert_max_num_queries(20):
+            userlist_helper.__change_identity_and_transfer_access_mapping(
+                user=user,
+                access_tag="github",
+                existing_user_identity=old_identity,
+                existing_user_access_mapping=old_identity.get_active_access_mapping(),
+                new_module_identity={"username": "new"},
+            )
+
+    new_identity = user.get_active_identity("github")
+    assert new_identity.identity == {"username": "new"}
+    assert new_identity.user_access_mapping.filter(status="Processing").count() == 30
+    assert old_identity.user_access_mapping.filter(
+        status="ProcessingRevoke"
+    ).count() == 30
+    # one revoke batch and one grant batch, other tasks are from creating users
+    batches = [
+        call.args
+        for call in background_task.call_args_list
+        if call.args[0].endswith("_batch")
+    ]
+    assert [task for task, _ in batches] == [
+        "run_access_revoke_batch",
+        "run_access_grant_batch",
+    ]
+    assert [len(request_ids) for _, request_ids in batches] == [30, 30]
+
+
+@pytest.mark.django_db
+def test_get_identity_templates_provisions_blank_identities(
+    mocker, django_assert_num_queries
+):
+    from django.contrib.auth.models import User as django_user
+    from Access import userlist_helper
+
+    mocker.patch(
+        "Access.helpers.get_access_module_identity_templates",
+        return_value={
+            "github": "github_access/identity_form.html",
+            "aws": "aws_access/identity_form.html",
+            "ssh": "",
+            "confluence": "",
+        },
+    )
+    auth_user = django_user.objects.create(username="user1", email="user1@example.com")
+    auth_user.user.create_new_identity(access_tag="github", identity={"username": "u1"})
+    auth_user.user.create_new_identity(access_tag="ssh", identity={})
+
+    # the identities query and one insert of the missing blank identity
+    with django_assert_num_queries(2):
+        context = userlist_helper.get_identity_templates(auth_user)
+
+    assert context["configured_identity_template"] == [
+        {
+            "accessUserTemplatePath": "github_access/identity_form.html",
+            "identity": {"username": "u1"},
+        }
+    ]
+    assert context["unconfigured_identity_template"] == [
+        {"accessUserTemplatePath": "aws_access/identity_form.html"}
+    ]
+    assert sorted(
+        auth_user.user.get_all_active_identity().values_list("access_tag", flat=True)
+    ) == ["confluence", "github", "ssh"]
+
+    with django_assert_num_queries(1):
+        userlist_helper.get_identity_templates(auth_user)
@@ -1,14 +1,20 @@
+import hashlib
 import json
 from Access import helpers
 from Access.background_task_manager import (
     background_task,
-    accept_request,
+    accept_requests,
     revoke_request,
+    revoke_requests,
 )
-from Access.models import User, ApprovalType
+from Access.models import User, UserIdentity, ApprovalType
 import logging
 from . import helpers as helper
+from django.contrib.auth.signals import user_logged_in
+from django.core.cache import cache
 from django.db import transaction
+from django.db.models import Q
+from django.dispatch import receiver
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +41,26 @@ IDENTITY_UNCHANGED_ERROR_MESSAGE = {
 
 OFFBOARDING_SUCCESS_MESSAGE = {"message": "Successfully initiated Offboard user"}
 
+USER_AUTOCOMPLETE_MIN_PREFIX_LENGTH = 2
+USER_AUTOCOMPLETE_DEFAULT_LIMIT = 20
+USER_AUTOCOMPLETE_MAX_LIMIT = 50
+USER_AUTOCOMPLETE_CACHE_TTL_SECONDS = 60
+USER_AUTOCOMPLETE_CACHE_PREFIX = "user_autocomplete"
+
+USER_DIRECTORY_DEFAULT_PAGE_SIZE = 20
+USER_DIRECTORY_MAX_PAGE_SIZE = 100
+USER_DIRECTORY_FIELDS = (
+    "id",
+    "name",
+    "email",
+    "state",
+    "offbaord_date",
+    "user__first_name",
+    "user__last_name",
+    "user__username",
+    "user__is_active",
+)
+
 
 class IdentityNotChangedException(Exception):
     def __init__(self):
@@ -42,41 +68,131 @@ class IdentityNotChangedException(Exception):
         super().__init__(self.message)
 
 
+def search_users(prefix, limit=USER_AUTOCOMPLETE_DEFAULT_LIMIT):
+    """Active users whose email or username starts with the prefix.
+
+    Args:
+        prefix (str): Start of the email or username, case insensitive.
+        limit (int): Maximum number of users returned.
+
+    Returns:
+        list: email and display name of the matching users, ordered by email.
+    """
+    prefix = (prefix or "").strip().lower()
+    if len(prefix) < USER_AUTOCOMPLETE_MIN_PREFIX_LENGTH:
+        return []
+    limit = max(1, min(limit, USER_AUTOCOMPLETE_MAX_LIMIT))
+
+    cache_key = "%s:%s:%s" % (
+        USER_AUTOCOMPLETE_CACHE_PREFIX,
+        limit,
+        hashlib.sha256(prefix.encode()).hexdigest(),
+    )
+    users = cache.get(cache_key)
+    if users is not None:
+        return users
+
+    # Separate lookups so each one is a prefix match on its own indexed column
+    active_users = User.objects.filter(state="1", email__isnull=False).order_by("email")
+    fields = ("email", "name", "user__first_name", "user__last_name")
+    matches = {}
+    for each_query in [
+        active_users.filter(email__istartswith=prefix),
+        active_users.filter(user__username__istartswith=prefix),
+    ]:
+        for each_user in each_query.values(*fields)[:limit]:
+            full_name = "%s %s" % (
+                each_user["user__first_name"],
+                each_user["user__last_name"],
+            )
+            matches[each_user["email"]] = full_name.strip() or each_user["name"] or ""
+
+    users = [
+        {"email": email, "name": matches[email]}
+        for email in sorted(matches)[:limit]
+    ]
+    cache.set(cache_key, users, USER_AUTOCOMPLETE_CACHE_TTL_SECONDS)
+    return users
+
+
 def get_identity_templates(auth_user):
-    user_identities = auth_user.user.get_all_active_identity()
+    """Configured and unconfigured identity templates of the user.
+
+    The active identities are read in one query and the templates come from
+    the module registry. Blank identities are normally provisioned at login,
+    they are only created here for modules installed since.
+    """
+    user = auth_user.user
+    identity_templates = helper.get_access_module_identity_templates()
     context = {}
     context["configured_identity_template"] = []
     context["unconfigured_identity_template"] = []
-    all_modules = helper.get_available_access_modules()
-    for user_identity in user_identities:
-        is_identity_configured = _is_valid_identity_json(
+    active_identity_tags = set()
+    configured_identity_tags = set()
+    for user_identity in user.get_all_active_identity():
+        active_identity_tags.add(user_identity.access_tag)
+        identity_template = identity_templates.get(user_identity.access_tag)
+        if identity_template and _is_valid_identity_json(
             identity=user_identity.identity
-        )
-        if is_identity_configured:
-            module = all_modules[user_identity.access_tag]
+        ):
             context["configured_identity_template"].append(
                 {
-                    "accessUserTemplatePath": module.get_identity_template(),
+                    "accessUserTemplatePath": identity_template,
                     "identity": user_identity.identity,
                 }
             )
-            all_modules.pop(user_identity.access_tag)
+            configured_identity_tags.add(user_identity.access_tag)
 
-    for mod in all_modules.values():
-        if not mod.get_identity_template():
-            if not auth_user.user.get_active_identity(mod.tag()):
-                auth_user.user.create_new_identity(
-                    access_tag=mod.tag(), identity={}
-                )
-            continue
-        context["unconfigured_identity_template"].append(
-            {
-                "accessUserTemplatePath": mod.get_identity_template(),
-            }
-        )
+    for access_tag, identity_template in identity_templates.items():
+        if identity_template and access_tag not in configured_identity_tags:
+            context["unconfigured_identity_template"].append(
+                {
+                    "accessUserTemplatePath": identity_template,
+                }
+            )
+
+    provision_blank_identities(user, active_identity_tags=active_identity_tags)
     return context
 
 
+def provision_blank_identities(user, active_identity_tags=None):
+    """Create the blank identity of every module which needs no identity input.
+
+    Missing identities are created with one bulk insert. Returns the access
+    tags of the created identities.
+    """
+    if active_identity_tags is None:
+        active_identity_tags = set(
+            user.get_all_active_identity().values_list("access_tag", flat=True)
+        )
+    missing_access_tags = [
+        access_tag
+        for access_tag, identity_template in (
+            helper.get_access_module_identity_templates().items()
+        )
+        if not identity_template and access_tag not in active_identity_tags
+    ]
+    if missing_access_tags:
+        UserIdentity.objects.bulk_create(
+            [
+                UserIdentity(user=user, access_tag=access_tag, identity={})
+                for access_tag in missing_access_tags
+            ],
+            # an identity created by a concurrent request is kept
+            ignore_conflicts=True,
+        )
+    return missing_access_tags
+
+
+@receiver(user_logged_in)
+def provision_blank_identities_on_login(sender, user, **kwargs):
+    try:
+        provision_blank_identities(user.user)
+    except Exception as e:
+        # login must not fail on identity provisioning
+        logger.exception("Blank identities not provisioned for %s: %s", user, e)
+
+
 def _is_valid_identity_json(identity):
     try:
         identity_json = json.loads(json.dumps(identity))
@@ -158,25 +274,81 @@ def __change_identity_and_transfer_access_mapping(
                     existing_user_access_mapping=existing_user_access_mapping
                 )
             )
-        system_user = User.get_system_user()
-
-        for mapping in existing_user_access_mapping:
-            if mapping.is_approved():
-                revoke_request(user_access_mapping=mapping, revoker=system_user)
+        revoke_requests(
+            [
+                mapping
+                for mapping in existing_user_access_mapping
+                if mapping.is_approved()
+            ],
+            revoker=User.get_system_user(),
+        )
 
         existing_user_identity.decline_all_non_approved_access_mappings("Identity Updated")
 
+    grant_mappings = []
     for mapping in new_user_access_mapping:
         if mapping.is_processing() or mapping.is_grantfailed():
-            if mapping.approver_2:
-                accept_request(user_access_mapping=mapping)
-            elif mapping.approver_1:
-                accept_request(user_access_mapping=mapping)
+            if mapping.approver_2_id or mapping.approver_1_id:
+                grant_mappings.append(mapping)
             else:
                 logger.fatal(
-                    "migration failed for request_id:%s mapping is approved but approvers are missing: %s",
+                    "migration failed for request_id:%s mapping is approved but approvers are missing",
                     mapping.request_id,
                 )
+    # revokes and grants are queued as batches once the transaction commits
+    accept_requests(grant_mappings)
+
+
+def get_user_directory_page(
+    search="", state="", after=None, page_size=USER_DIRECTORY_DEFAULT_PAGE_SIZE
+):
+    """One page of the user directory, keyset paged on the user id.
+
+    Args:
+        search (str): Start of the email, username, first or last name.
+        state (str): Only users in this state key, all users if empty.
+        after (int): id of the last user on the previous page.
+        page_size (int): Number of users on the page.
+
+    Returns:
+        dict: users on the page and the cursor for the next page, None on the
+        last page.
+    """
+    page_size = max(1, min(page_size, USER_DIRECTORY_MAX_PAGE_SIZE))
+    users = User.objects.order_by("id")
+    search = (search or "").strip()
+    if search:
+        users = users.filter(
+            Q(email__istartswith=search)
+            | Q(user__username__istartswith=search)
+            | Q(user__first_name__istartswith=search)
+            | Q(user__last_name__istartswith=search)
+        )
+    if state:
+        users = users.filter(state=state)
+    if after:
+        users = users.filter(id__gt=after)
+
+    # one extra row tells whether there is a next page
+    rows = list(users.values(*USER_DIRECTORY_FIELDS)[: page_size + 1])
+    user_states = dict(User.USER_STATUS_CHOICES)
+    dataList = [
+        {
+            "name": row["name"],
+            "first_name": row["user__first_name"],
+            "last_name": row["user__last_name"],
+            "email": row["email"],
+            "username": row["user__username"],
+            "is_active": row["user__is_active"],
+            "offbaord_date": row["offbaord_date"],
+            "state": user_states.get(row["state"]),
+        }
+        for row in rows[:page_size]
+    ]
+    return {
+        "dataList": dataList,
+        "nextCursor": rows[page_size - 1]["id"] if len(rows) > page_size else None,
+    }
 
 
 def getallUserList(request):
@@ -190,27 +362,19 @@ def getallUserList(request):
             PERMISSION_ALLOW_USER_OFFBOARD
         )
 
-        dataList = []
-        for each_user in User.objects.all():
-            dataList.append(
-                {
-                    "name": each_user.name,
-                    "first_name": each_user.user.first_name,
-                    "last_name": each_user.user.last_name,
-                    "email": each_user.email,
-                    "username": each_user.user.username,
-                    # "git_username": each_user.gitusername,
-                    "is_active": each_user.user.is_active,
-                    "offbaord_date": each_user.offbaord_date,
-                    "state": each_user.current_state(),
-                }
-            )
-        context = {}
-        context["dataList"] = dataList
+        context = get_user_directory_page(
+            search=request.GET.get("search", ""),
+            state=request.GET.get("state", ""),
+            after=int(request.GET.get("after") or 0),
+            page_size=int(
+                request.GET.get("pageSize", USER_DIRECTORY_DEFAULT_PAGE_SIZE)
+            ),
+        )
         context["viewDetails"] = {
             "numColumns": 8 if allowOffboarding else 7,
             "allowOffboarding": allowOffboarding,
         }
+        context["userStates"] = User.USER_STATUS_CHOICES
         return context
     except Exception as e:
         logger.debug("Error in request not found OR Invalid request type")
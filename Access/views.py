@@ -7,7 +7,7 @@ from django.contrib.auth.decorators import login_required
 from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
 from django.contrib.auth.models import User as djangoUser
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
 
 from Access import views_helper
@@ -24,10 +24,17 @@ from Access.accessrequest_helper import (
     run_accept_request_task,
     run_ignore_failure_task,
 )
+from Access.bulk_access_request import (
+    BulkAccessRequestException,
+    create_bulk_access_requests,
+    validate_bulk_access_requests,
+)
 from Access.models import User, UserAccessMapping, GroupAccessMapping
 
 from Access.userlist_helper import (
     getallUserList,
+    search_users,
+    USER_AUTOCOMPLETE_DEFAULT_LIMIT,
     get_identity_templates,
     create_identity,
     offboard_user,
@@ -67,15 +74,26 @@ def show_access_history(request):
             "Please login again",
         )
 
-    return render(
-        request,
-        "EnigmaOps/showAccessHistory.html",
+    all_access_modules = helper.get_available_access_modules()
+    access_tag = request.GET.get("accessTag", "")
+    status = request.GET.get("status", "")
+    context = access_user.get_access_history(
+        all_access_modules,
+        page=request.GET.get("page", 1),
+        access_tag=access_tag,
+        status=status,
+    )
+    context.update(
         {
-            "dataList": access_user.get_access_history(
-                helper.get_available_access_modules()
-            )
-        },
+            "access_types": sorted(all_access_modules.keys(), key=str.casefold),
+            "statuses": [
+                status_key for status_key, _ in UserAccessMapping.STATUS_CHOICES
+            ],
+            "selected_access_tag": access_tag,
+            "selected_status": status,
+        }
     )
+    return render(request, "EnigmaOps/showAccessHistory.html", context)
 
 
 @login_required
@@ -172,11 +190,43 @@ def create_new_group(request):
 
 @login_required
 def all_users_list(request):
-    """List of all users."""
+    """List of all users, one page at a time.
+
+    Args:
+        request (HTTPRequest): search, state, after and pageSize select the
+        page. responseType json returns only the page.
+
+    Returns:
+        HTTPResponse: User list page, or JsonResponse with a page of users.
+    """
     context = getallUserList(request)
+    if request.GET.get("responseType") == "json":
+        return JsonResponse(context, status=400 if "error" in context else 200)
+    # the first page is embedded in the page, the rest are fetched as json
+    context["initialUsers"] = {
+        "dataList": context.get("dataList", []),
+        "nextCursor": context.get("nextCursor"),
+    }
     return render(request, "EnigmaOps/allUsersList.html", context)
 
 
+@login_required
+def user_autocomplete(request):
+    """Active users matching the typed email or username prefix.
+
+    Args:
+        request (HTTPRequest): q is the prefix and limit the maximum results.
+
+    Returns:
+        JsonResponse: Matching users with their email and name.
+    """
+    try:
+        limit = int(request.GET.get("limit", USER_AUTOCOMPLETE_DEFAULT_LIMIT))
+    except ValueError:
+        return JsonResponse({"error": "Invalid limit"}, status=400)
+    return JsonResponse({"users": search_users(request.GET.get("q"), limit)})
+
+
 @login_required
 def user_offboarding(request):
     """offboard a user.
@@ -220,6 +270,36 @@ def request_access(request):
     return render(request, "EnigmaOps/accessRequestForm.html", context)
 
 
+@api_view(["POST"])
+@authentication_classes((TokenAuthentication, BasicAuthentication))
+@login_required
+@user_admin_or_ops
+def bulk_request_access(request):
+    """Request accesses for many users at once.
+
+    Args:
+        request (HTTPRequest): JSON body with the "requests" list of email,
+            accessTag, accessLabels and reason, and the "autoApprove" flag.
+
+    Returns:
+        StreamingHttpResponse: One JSON report per line for every request,
+            or JsonResponse with the error if the body is invalid. All the
+            requests are created before the reports are streamed.
+    """
+    items = request.data.get("requests")
+    try:
+        validate_bulk_access_requests(items)
+    except BulkAccessRequestException as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    reports = create_bulk_access_requests(
+        request.user.user, items, auto_approve=bool(request.data.get("autoApprove"))
+    )
+    return StreamingHttpResponse(
+        (json.dumps(report) + "\n" for report in reports),
+        content_type="application/x-ndjson",
+    )
+
+
 @login_required
 def group_access(request):
     """Request access to a group.
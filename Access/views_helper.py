@@ -6,9 +6,12 @@ import traceback
 
 import csv
 from . import helpers as helper
-from .models import UserAccessMapping
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from .models import User, UserAccessMapping, MembershipV2, GroupV2
 from bootprocess import general
 from Access.background_task_manager import background_task, accept_request
+from EnigmaAutomation.settings import DEFAULT_ACCESS_GROUP
 
 logger = logging.getLogger(__name__)
 
@@ -77,6 +80,77 @@ def execute_group_access(user_mappings_list):
             )
 
 
+def add_user_to_default_access_group(user):
+    """ Add a new user to DEFAULT_ACCESS_GROUP and grant the group accesses """
+    if MembershipV2.objects.filter(
+        user=user, group__name=DEFAULT_ACCESS_GROUP, status="Approved"
+    ).exists():
+        return False
+
+    group = GroupV2.objects.filter(name=DEFAULT_ACCESS_GROUP, status="Approved").first()
+    if not group:
+        return False
+    group_owner = (
+        MembershipV2.objects.filter(group=group, status="Approved", is_owner=True)
+        .select_related("user")
+        .first()
+    )
+    if not group_owner:
+        logger.error("Group %s has no owner to approve new joiners", group.name)
+        return False
+
+    membership_id = (
+        user.name
+        + "-"
+        + str(group)
+        + "-membership-"
+        + datetime.datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    )
+    with transaction.atomic():
+        member = MembershipV2.objects.create(
+            group=group,
+            user=user,
+            reason="New joiner added to Org defaut access group.",
+            membership_id=membership_id,
+            requested_by=group_owner.user,
+            approver=group_owner.user,
+            status="Approved",
+        )
+        user_mappings_list = generate_user_mappings(user, group, member)
+
+    execute_group_access(user_mappings_list)
+    logger.debug(
+        "Process has been started for the Approval of request - "
+        + membership_id
+        + " - Approver="
+        + group_owner.user.user.username
+    )
+    return True
+
+
+def enroll_users_missing_from_default_access_group():
+    """
+    Add the active users without an approved membership to DEFAULT_ACCESS_GROUP.
+    New users are enrolled when they are created, this catches up the users
+    created before the default group existed. Returns the enrolled count.
+    """
+    users = User.objects.filter(state="1").filter(
+        ~Exists(
+            MembershipV2.objects.filter(
+                user=OuterRef("pk"), group__name=DEFAULT_ACCESS_GROUP, status="Approved"
+            )
+        )
+    )
+    enrolled_count = 0
+    for user in users.iterator():
+        try:
+            if add_user_to_default_access_group(user):
+                enrolled_count += 1
+        except Exception as e:
+            logger.exception("Could not enroll %s in the default group: %s", user, e)
+    return enrolled_count
+
+
 def decline_group_other_access(access_mapping):
     user = access_mapping.user
     access_mapping.decline_access(
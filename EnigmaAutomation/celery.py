@@ -10,3 +10,16 @@ app.conf.task_default_queue = "default_queue"
 app.conf.update(task_track_started=True)
 app.conf.update(result_extended=True)
 app.autodiscover_tasks(lambda: settings.INSTALLED_APPS, related_name="background_task_manager")
+
+# sweeps pick up the work whose scheduled task was lost, run the worker with -B
+app.conf.beat_schedule = {
+    "send-due-access-grant-digests": {
+        "task": "Access.background_task_manager.send_due_access_grant_digests",
+        "schedule": 60.0,
+    },
+    # notifications whose send was lost or whose worker died holding them
+    "send-outbound-notifications": {
+        "task": "Access.background_task_manager.send_outbound_notifications",
+        "schedule": 60.0,
+    },
+}
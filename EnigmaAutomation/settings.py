@@ -12,20 +12,19 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 
 import glob
 from os.path import join
-import json
 from pathlib import Path
 import os
 import time
 import random
 import django
 from django.utils.translation import gettext
+from scripts.config_loader import get_config, load_json_file
 django.utils.translation.ugettext = gettext
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-with open("config.json") as data_file:
-    data = json.load(data_file)
+data = get_config()
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.1/howto/deployment/checklist/
@@ -192,11 +191,7 @@ USE_I18N = True
 
 USE_TZ = True
 
-DECLINE_REASONS = json.load(
-    open(
-        "constants.json",
-    )
-)["declineReasons"]
+DECLINE_REASONS = load_json_file("constants.json")["declineReasons"]
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.1/howto/static-files/
@@ -217,7 +212,8 @@ SOCIAL_AUTH_GOOGLE_OAUTH2_SECRET = google_auth_config["SOCIAL_AUTH_GOOGLE_OAUTH2
 SOCIAL_AUTH_LOGIN_REDIRECT_URL = '/'
 LOGIN_URL = 'login/'
 
-if data["background_task_manager"]["type"] == "celery":
+BACKGROUND_TASK_MANAGER_TYPE = data["background_task_manager"]["type"]
+if BACKGROUND_TASK_MANAGER_TYPE == "celery":
     background_task_manager_config = data["background_task_manager"]["config"]
     CELERY_BROKER_URL = background_task_manager_config["broker"]
     CELERY_RESULT_BACKEND = background_task_manager_config["backend"]
@@ -257,6 +253,15 @@ elif data["database"]["engine"] == "sqlite3":
 else:
     raise Exception("Database engine %s not recognized" % data["database"]["engine"])
 
+# Shared by the web and celery processes, the table is created by
+# `manage.py createcachetable`
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "enigma_cache",
+    }
+}
+
 PERMISSION_CONSTANTS = {"DEFAULT_APPROVER_PERMISSION": "ACCESS_APPROVE"}
 
 DEFAULT_ACCESS_GROUP = "default_access_group"
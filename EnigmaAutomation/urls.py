@@ -30,7 +30,9 @@ from Access.views import (
     all_user_access_list,
     mark_revoked,
     all_users_list,
+    user_autocomplete,
     request_access,
+    bulk_request_access,
     group_access,
     group_access_list,
     approve_new_group,
@@ -63,7 +65,11 @@ urlpatterns = [
     re_path(r"^access/userAccesses$", all_user_access_list, name="allUserAccessList"),
     re_path(r"^access/usersList$", all_users_list, name="allUsersList"),
     re_path(r"^user/offboardUser$", user_offboarding, name="offboarding_user"),
+    re_path(r"^user/autocomplete$", user_autocomplete, name="userAutocomplete"),
     re_path(r"^access/requestAccess$", request_access, name="requestAccess"),
+    re_path(
+        r"^access/bulkRequestAccess$", bulk_request_access, name="bulkRequestAccess"
+    ),
     re_path(r"^group/requestAccess$", group_access, name="groupRequestAccess"),
     re_path(
         r"^group/access/list/(?P<group_name>[\w -]+)$",
@@ -1,24 +1,111 @@
 from django.core import mail
 from django.core.mail import BadHeaderError
+from celery import shared_task
+from smtplib import SMTPServerDisconnected
 import logging
-from EnigmaAutomation.settings import EMAIL_BACKEND, DEFAULT_FROM_EMAIL
+import threading
+from EnigmaAutomation.settings import (
+    EMAIL_BACKEND,
+    DEFAULT_FROM_EMAIL,
+    BACKGROUND_TASK_MANAGER_TYPE,
+)
 logger = logging.getLogger(__name__)
 
+EMAIL_BATCH_SIZE = 50
+
+# One long lived connection to the mail server per worker process,
+# opened on first use so that it is never shared across forked workers
+pooled_connection = None
+pooled_connection_lock = threading.Lock()
+
+
 def emailSES(destination, subject, body):
-    if destination and subject and body:
-        with mail.get_connection(backend=EMAIL_BACKEND) as connection:
-            try:
-                email = mail.EmailMessage(subject=subject, body=body,
-                                        from_email=DEFAULT_FROM_EMAIL, to=destination,
-                                        connection=connection)
-                email.content_subtype = "html"
-                response = email.send(fail_silently=False)
-                if response != 1:
-                    raise Exception('Message not delivered. Contact Admin for more details.')
-            except BadHeaderError:
-                raise Exception("Invalid header found.")
+    """ Queue an email, it is sent by the background sender """
+    queue_emails([email_message(destination, subject, body)])
+    return True
+
+
+def email_message(destination, subject, body):
+    return {"destination": destination, "subject": subject, "body": body}
+
+
+def queue_emails(messages):
+    """ Queue a batch of emails to be sent over the pooled connection """
+    for message in messages:
+        # build the message once so invalid emails fail for the caller
+        _build_email(**message)
+
+    if BACKGROUND_TASK_MANAGER_TYPE == "celery":
+        # one task per batch, so that a retry resends only its own batch
+        for start in range(0, len(messages), EMAIL_BATCH_SIZE):
+            send_queued_emails.delay(messages[start:start + EMAIL_BATCH_SIZE])
     else:
-        raise Exception('Make sure all fields are entered and valid.')
+        # the outbox table keeps the emails across restarts of the process,
+        # Access.models imports this module
+        from Access.models import OutboundNotification
+
+        for message in messages:
+            OutboundNotification.enqueue(**message)
+
+    logger.info("Email queued!!")
+    return True
+
+
+@shared_task(
+    autoretry_for=(Exception,), retry_kwargs={"max_retries": 3, "countdown": 5}
+)
+def send_queued_emails(messages):
+    return send_emails(messages)
+
+
+def send_emails(messages):
+    """ Send emails right away in batches over the pooled connection """
+    emails = [_build_email(**message) for message in messages]
+    for start in range(0, len(emails), EMAIL_BATCH_SIZE):
+        batch = emails[start:start + EMAIL_BATCH_SIZE]
+        with pooled_connection_lock:
+            sent_count = _send_over_pooled_connection(batch)
+        if sent_count != len(batch):
+            raise Exception('Message not delivered. Contact Admin for more details.')
 
     logger.info("Email Sent!!")
     return True
+
+
+def get_pooled_connection():
+    global pooled_connection
+    if pooled_connection is None:
+        pooled_connection = mail.get_connection(backend=EMAIL_BACKEND)
+    return pooled_connection
+
+
+def _send_over_pooled_connection(emails):
+    connection = get_pooled_connection()
+    try:
+        # open is a no-op when the connection is already open, this also
+        # stops send_messages from closing the connection after the batch
+        connection.open()
+        sent_count = connection.send_messages(emails[:1])
+    except SMTPServerDisconnected:
+        # the idle connection went stale, no email of the batch was sent yet
+        logger.info("Mail server closed the pooled connection, reconnecting")
+        connection.close()
+        connection.open()
+        sent_count = connection.send_messages(emails[:1])
+    # a disconnect past the first email raises, resending the whole batch
+    # would deliver the accepted emails twice
+    return sent_count + connection.send_messages(emails[1:])
+
+
+def _build_email(destination, subject, body):
+    if not (destination and subject and body):
+        raise Exception('Make sure all fields are entered and valid.')
+    email = mail.EmailMessage(subject=subject, body=body,
+                              from_email=DEFAULT_FROM_EMAIL, to=destination)
+    email.content_subtype = "html"
+    try:
+        email.message()
+    except BadHeaderError:
+        raise Exception("Invalid header found.")
+    return email
+
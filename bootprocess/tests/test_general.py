@@ -0,0 +1,108 @@
+import pytest
+from smtplib import SMTPServerDisconnected
+from bootprocess import general
+from Access.models import OutboundNotification
+
+
+@pytest.mark.parametrize(
+    "testName, messageCount, expectedBatches",
+    [
+        ("single email", 1, 1),
+        ("emails filling exactly one batch", 50, 1),
+        ("emails spilling into a second batch", 51, 2),
+    ],
+)
+def test_send_emails(mocker, testName, messageCount, expectedBatches):
+    connection = mocker.MagicMock()
+    connection.send_messages.side_effect = lambda emails: len(emails)
+    mocker.patch("bootprocess.general.get_pooled_connection", return_value=connection)
+
+    messages = [
+        general.email_message(["user%s@example.com" % i], "subject", "body")
+        for i in range(messageCount)
+    ]
+
+    assert general.send_emails(messages)
+    # the first email of each batch, then the rest of it
+    assert connection.send_messages.call_count == 2 * expectedBatches
+    assert sum(
+        len(call.args[0]) for call in connection.send_messages.call_args_list
+    ) == messageCount
+    assert connection.close.call_count == 0
+
+
+def test_send_emails_reconnects_when_disconnected(mocker):
+    connection = mocker.MagicMock()
+    connection.send_messages.side_effect = [SMTPServerDisconnected(), 1, 1]
+    mocker.patch("bootprocess.general.get_pooled_connection", return_value=connection)
+
+    assert general.send_emails(
+        [
+            general.email_message(["user%s@example.com" % i], "subject", "body")
+            for i in range(2)
+        ]
+    )
+    assert connection.close.call_count == 1
+    assert connection.send_messages.call_count == 3
+
+
+def test_send_emails_does_not_resend_after_a_sent_email(mocker):
+    connection = mocker.MagicMock()
+    connection.send_messages.side_effect = [1, SMTPServerDisconnected()]
+    mocker.patch("bootprocess.general.get_pooled_connection", return_value=connection)
+
+    with pytest.raises(SMTPServerDisconnected):
+        general.send_emails(
+            [
+                general.email_message(["user%s@example.com" % i], "subject", "body")
+                for i in range(3)
+            ]
+        )
+    assert connection.close.call_count == 0
+    assert connection.send_messages.call_count == 2
+
+
+def test_queue_emails_rejects_invalid_email(mocker):
+    mocker.patch("bootprocess.general.send_queued_emails")
+    mocker.patch("Access.models.OutboundNotification.enqueue")
+
+    with pytest.raises(Exception):
+        general.queue_emails([general.email_message(["user@example.com"], "", "body")])
+
+    assert general.send_queued_emails.delay.call_count == 0
+    assert OutboundNotification.enqueue.call_count == 0
+
+
+@pytest.mark.parametrize(
+    (
+        "testName, backgroundTaskManagerType, messageCount, expectedTasks,"
+        " expectedEnqueued"
+    ),
+    [
+        ("celery queues one task per batch", "celery", 101, 3, 0),
+        ("threading writes emails to the outbox", "threading", 3, 0, 3),
+    ],
+)
+def test_queue_emails(
+    mocker,
+    testName,
+    backgroundTaskManagerType,
+    messageCount,
+    expectedTasks,
+    expectedEnqueued,
+):
+    mocker.patch(
+        "bootprocess.general.BACKGROUND_TASK_MANAGER_TYPE", backgroundTaskManagerType
+    )
+    mocker.patch("bootprocess.general.send_queued_emails")
+    mocker.patch("Access.models.OutboundNotification.enqueue")
+
+    general.queue_emails(
+        [
+            general.email_message(["user%s@example.com" % i], "subject", "body")
+            for i in range(messageCount)
+        ]
+    )
+
+    assert general.send_queued_emails.delay.call_count == expectedTasks
+    assert OutboundNotification.enqueue.call_count == expectedEnqueued
@@ -0,0 +1,72 @@
+""" Micro-benchmark of notification rendering with and without compiled template cache
+
+Run from the repository root with `python -m scripts.benchmark_templates`
+"""
+
+import logging
+import os
+import timeit
+
+import django
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level=logging.INFO,
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+
+TEMPLATE = "membershipAcceptedEmailBody.html"
+RENDER_COUNT = 1000
+REPEAT = 5
+
+
+def _context(index):
+    return {
+        "user_name": "user%s@example.com" % index,
+        "group_name": "benchmark-group",
+        "approver": "approver",
+    }
+
+
+def render_uncached():
+    from django.template import loader
+
+    for index in range(RENDER_COUNT):
+        loader.get_template(TEMPLATE).render(_context(index))
+
+
+def render_cached():
+    from Access import helpers
+
+    for index in range(RENDER_COUNT):
+        helpers.generateStringFromTemplate(TEMPLATE, **_context(index))
+
+
+def render_batch():
+    from Access import helpers
+
+    helpers.generateStringsFromTemplate(
+        TEMPLATE, [_context(index) for index in range(RENDER_COUNT)]
+    )
+
+
+def __main__():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "EnigmaAutomation.settings")
+    django.setup()
+
+    for name, render in [
+        ("loader.get_template per render", render_uncached),
+        ("compiled template cache", render_cached),
+        ("batch render", render_batch),
+    ]:
+        best = min(timeit.repeat(render, number=1, repeat=REPEAT))
+        logger.info(
+            "%s: %.2f ms for %s renders (%.1f us per render)",
+            name, best * 1000, RENDER_COUNT, best * 1000000 / RENDER_COUNT
+        )
+
+
+if __name__ == "__main__":
+    __main__()
@@ -1,13 +1,23 @@
-""" Script to clone access modules from git urls specified in config.json """
+""" Script to clone access modules from git urls specified in config.json
 
+Run with --sync to update only the repos which moved since the last run
+"""
+
+import ast
+import hashlib
+import json
 import logging
 import os
+import re
 import shutil
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit
 
-from git import Repo, GitCommandError
+from git import Git, Repo, GitCommandError
 
+from .config_loader import load_json_file
 from . import helpers
 
 logger = logging.getLogger(__name__)
@@ -18,6 +28,10 @@ logging.basicConfig(
     ]
 )
 
+DEFAULT_CACHE_DIR = ".access_modules_cache"
+DEFAULT_CLONE_CONCURRENCY = 4
+CLONE_RETRY_BACKOFF_SECONDS = 2
+
 
 def ensure_access_modules_config(config):
     """ Validate access_modules config """
@@ -67,23 +81,89 @@ def get_repo_url_and_branch(formatted_git_arg):
     return url, target_branch
 
 
-def clone_repo(formatted_git_arg, retry_limit):
-    """ Clone a single repo """
+def get_lock_key(formatted_git_arg):
+    """
+    Lockfile key of a repo: its url without credentials, and its branch.
+    Urls of private repos carry a token which must not be written to disk.
+    """
     url, target_branch = get_repo_url_and_branch(formatted_git_arg)
+    parsed_url = urlsplit(url)
+    url = urlunsplit(
+        parsed_url._replace(netloc=parsed_url.netloc.rpartition("@")[2]))
+    if target_branch:
+        return url + "#" + target_branch
+    return url
+
+
+def resolve_remote_commit(url, target_branch):
+    """ Get the commit the branch, or the default branch, points to on the remote """
+    ref = target_branch or "HEAD"
+    remote_refs = [
+        line.split("\t") for line in Git().ls_remote(url, ref).splitlines()
+    ]
+    if not remote_refs:
+        raise Exception(f"Could not find {ref} in {url}")
+    # annotated tags are listed twice, the peeled ref points to the commit
+    for commit, ref_name in remote_refs:
+        if ref_name.endswith("^{}"):
+            return commit
+    return remote_refs[0][0]
+
+
+def get_cache_path(cache_dir, url, commit):
+    """ Cache folder of a repo at a commit """
+    url_key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir, url_key, commit)
 
-    folder_name = url.split("/").pop()[:-4]
-    target_folder_path = "./Access/access_modules/" + folder_name
+
+def prune_cache(cache_dir, kept_paths):
+    """
+    Remove the cached commits which are not in kept_paths. Run once all
+    clones are done, repos cloned in parallel can share a cache folder.
+    """
+    kept_paths = {os.path.abspath(each_path) for each_path in kept_paths}
+    for each_repo in os.listdir(cache_dir):
+        repo_cache_dir = os.path.join(cache_dir, each_repo)
+        for each_commit in os.listdir(repo_cache_dir):
+            commit_path = os.path.join(repo_cache_dir, each_commit)
+            if os.path.abspath(commit_path) not in kept_paths:
+                helpers.remove_directory_with_contents(commit_path)
+        if not os.listdir(repo_cache_dir):
+            os.rmdir(repo_cache_dir)
+
+
+def clone_repo(formatted_git_arg, retry_limit, cache_dir):
+    """
+    Shallow clone a single repo into the cache and return the cached path.
+    A commit which is already cached is not fetched again.
+    """
+    url, target_branch = get_repo_url_and_branch(formatted_git_arg)
 
     retry_exception = None
     for clone_attempt in range(1, retry_limit + 1):
         try:
+            cached_path = get_cache_path(
+                cache_dir, url, resolve_remote_commit(url, target_branch))
+            if os.path.isdir(cached_path):
+                logger.info("Using cached clone %s", cached_path)
+                return cached_path
+
             logger.info("Cloning Repo")
+            partial_path = cached_path + ".partial"
+            helpers.remove_directory_with_contents(partial_path)
+            clone_options = {"depth": 1, "single_branch": True}
             if target_branch:
-                Repo.clone_from(url, target_folder_path, branch=target_branch)
+                clone_options["branch"] = target_branch
+            repo = Repo.clone_from(url, partial_path, **clone_options)
+
+            # the branch can move between resolving and cloning it
+            cached_path = get_cache_path(cache_dir, url, repo.head.commit.hexsha)
+            if os.path.isdir(cached_path):
+                helpers.remove_directory_with_contents(partial_path)
             else:
-                Repo.clone_from(url, target_folder_path)
+                os.rename(partial_path, cached_path)
         except (GitCommandError, Exception) as exception:
-            sleep_time = 10 * clone_attempt
+            sleep_time = CLONE_RETRY_BACKOFF_SECONDS * 2 ** (clone_attempt - 1)
             logger.error(
                 "Error while cloning repo. Error %s.",
                 exception,
@@ -104,92 +184,246 @@ def clone_repo(formatted_git_arg, retry_limit):
         logger.exception("Max retry count reached while cloning repo")
         raise retry_exception
 
-    return target_folder_path
+    return cached_path
 
 
-def move_modules_from_cloned_repo(cloned_path):
+def get_modules_in_cloned_repo(cloned_path):
+    """ Folders of the cloned repo which are access modules """
+    blacklist_paths = [
+        ".git",
+        ".github",
+        "secrets",
+        "docs",
+    ]
+    return sorted(
+        each_path for each_path in os.listdir(cloned_path)
+        if os.path.isdir(cloned_path + "/" + each_path)
+        and each_path not in blacklist_paths
+    )
+
+
+def install_module_from_cloned_repo(cloned_path, module_name):
     """
-    Move access modules from the cloned folder to proper structure
+    Copy an access module from the cloned folder to proper structure.
+    The module is copied next to the installed one and swapped in with
+    renames, so a failed copy leaves the installed module untouched.
     """
-    for each_path in os.listdir(cloned_path):
-        blacklist_paths = [
-            ".git",
-            ".github",
-            "secrets",
-            "docs",
-        ]
-        if (
-            os.path.isdir(cloned_path + "/" + each_path)
-            and each_path not in blacklist_paths
-        ):
-            try:
-                os.rename(
-                    cloned_path + "/" + each_path,
-                    "./Access/access_modules/" + each_path
-                )
-            except Exception as exception:
-                logger.exception(
-                    "Failed to move access module to proper structure %s",
-                    exception
-                )
-                raise Exception(
-                    f"Failed to move access module to proper structure {exception}") from exception
-
-
-def ensure_access_modules_requirements(
-        cloned_path, core_requirements_file_path):
+    target_path = "./Access/access_modules/" + module_name
+    staged_path = "./Access/access_modules/.staged_" + module_name
+    replaced_path = "./Access/access_modules/.replaced_" + module_name
+    try:
+        helpers.remove_directory_with_contents(staged_path)
+        shutil.copytree(cloned_path + "/" + module_name, staged_path)
+        if os.path.isdir(target_path):
+            helpers.remove_directory_with_contents(replaced_path)
+            os.rename(target_path, replaced_path)
+        os.rename(staged_path, target_path)
+        helpers.remove_directory_with_contents(replaced_path)
+    except Exception as exception:
+        logger.exception(
+            "Failed to copy access module to proper structure %s",
+            exception
+        )
+        raise Exception(
+            f"Failed to copy access module to proper structure {exception}") from exception
+
+
+def read_module_requirements(cloned_path):
+    """ Requirements of the access modules in a cloned repo """
+    requirements_file_path = cloned_path + "/requirements.txt"
+    if not os.path.isfile(requirements_file_path):
+        return []
+    return sorted(set(
+        each_line
+        for each_line in helpers.read_content_from_file(requirements_file_path)
+        if each_line
+    ))
+
+
+def merge_requirements(locked_repos):
     """ Consolidate requirements from multiple access modules """
-    for each_path in os.listdir(cloned_path):
-        if each_path == "requirements.txt":
-            current_requirements_file = cloned_path + "/" + each_path
+    all_requirements = set()
+    for each_repo in locked_repos.values():
+        all_requirements.update(each_repo["requirements"])
+    return sorted(all_requirements)
+
 
-            all_requirements = helpers.read_content_from_file(
-                current_requirements_file)
-            all_requirements.extend(
-                helpers.read_content_from_file(core_requirements_file_path))
+def read_lockfile(lockfile_path):
+    """ Installed commit, modules and requirements of each repo """
+    if not os.path.isfile(lockfile_path):
+        return {"repos": {}}
+    return helpers.read_json_from_file(lockfile_path)
 
-            # Ensure requirements are unique
-            merged_requirements = list(set(all_requirements))
 
-            # Update the requirements.txt
-            helpers.write_content_to_file(
-                core_requirements_file_path, sorted(merged_requirements))
+def write_lockfile(lockfile_path, lock):
+    """ Write the lockfile, replacing the previous one in a single rename """
+    helpers.write_content_to_file(
+        lockfile_path + ".tmp", [json.dumps(lock, indent=4, sort_keys=True)])
+    os.replace(lockfile_path + ".tmp", lockfile_path)
 
 
-def clone_access_modules():
-    """ Core function to clone access modules repo """
-    config = helpers.read_json_from_file("./config.json")
+def is_repo_up_to_date(formatted_git_arg, locked_repo):
+    """ Check if the installed modules are at the current remote commit """
+    if locked_repo is None or not all(
+        os.path.isdir("./Access/access_modules/" + each_module)
+        for each_module in locked_repo["modules"]
+    ):
+        return False
+    url, target_branch = get_repo_url_and_branch(formatted_git_arg)
+    try:
+        return resolve_remote_commit(url, target_branch) == locked_repo["commit"]
+    except (GitCommandError, Exception) as exception:
+        logger.error("Could not resolve remote commit. Error %s.", exception)
+        return False
+
+
+def get_access_module_tag(access_file_path):
+    """
+    Read the tag returned by the module's tag() method without importing it.
+    Returns None if tag() does not return a string literal.
+    """
+    with open(access_file_path, mode="r", encoding='utf-8') as access_file:
+        tree = ast.parse(access_file.read())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.FunctionDef) and node.name == "tag":
+            for statement in node.body:
+                if (
+                    isinstance(statement, ast.Return)
+                    and isinstance(statement.value, ast.Constant)
+                    and isinstance(statement.value.value, str)
+                ):
+                    return statement.value.value
+    return None
+
+
+def write_access_modules_manifest(access_modules_path, manifest_file_path):
+    """
+    Write the tag to import path manifest used to import access modules
+    lazily. Modules whose tag can not be read are left out, they are found
+    by importing all modules on disk.
+    """
+    manifest = {"modules": {}}
+    for each_module in sorted(os.listdir(access_modules_path)):
+        access_file_path = os.path.join(access_modules_path, each_module, "access.py")
+        if (
+            re.match(r"(base_|__pycache__|secrets|\.)", each_module)
+            or not os.path.isfile(access_file_path)
+        ):
+            continue
+        tag = get_access_module_tag(access_file_path)
+        if tag is None:
+            logger.warning(
+                "Could not read tag of access module %s, it will not be lazily loaded",
+                each_module,
+            )
+            continue
+        manifest["modules"][tag] = f"Access.access_modules.{each_module}.access"
+
+    helpers.write_content_to_file(
+        manifest_file_path, [json.dumps(manifest, indent=4, sort_keys=True)])
+
+
+def clone_access_modules(sync=False):
+    """
+    Core function to clone access modules repo.
+    With sync, only repos that moved since the commit recorded in the
+    lockfile are fetched and reinstalled.
+    """
+    config = load_json_file("./config.json")
     ensure_access_modules_config(config)
 
     retry_limit = config["access_modules"].get("RETRY_LIMIT", 5)
+    cache_dir = config["access_modules"].get("CACHE_DIR", DEFAULT_CACHE_DIR)
+    clone_concurrency = config["access_modules"].get(
+        "CLONE_CONCURRENCY", DEFAULT_CLONE_CONCURRENCY)
     git_urls = config["access_modules"]["git_urls"]
     requirements_file_path = 'Access/access_modules/requirements.txt'
+    manifest_file_path = 'Access/access_modules/manifest.json'
 
     helpers.ensure_folder_exists('Access/access_modules')
+    os.makedirs(cache_dir, exist_ok=True)
 
-    remove_stale_cloned_modules()
+    locked_repos = {}
+    if sync:
+        locked_repos = read_lockfile(helpers.ACCESS_MODULES_LOCKFILE_PATH)["repos"]
+    if not locked_repos:
+        remove_stale_cloned_modules()
     initialize_init_file()
 
-    helpers.ensure_file_exists(requirements_file_path)
-
-    for formatted_git_arg in git_urls:
-        cloned_path = clone_repo(formatted_git_arg, retry_limit)
-
-        ensure_access_modules_requirements(cloned_path, requirements_file_path)
-        move_modules_from_cloned_repo(cloned_path)
-
+    def sync_repo(formatted_git_arg):
+        lock_key = get_lock_key(formatted_git_arg)
+        if is_repo_up_to_date(formatted_git_arg, locked_repos.get(lock_key)):
+            logger.info("%s is up to date", lock_key)
+            return None
+        return clone_repo(formatted_git_arg, retry_limit, cache_dir)
+
+    with ThreadPoolExecutor(max_workers=clone_concurrency) as executor:
+        cloned_paths = list(executor.map(sync_repo, git_urls))
+
+    # keep the cached commit of every configured repo, up to date ones too
+    prune_cache(cache_dir, [
+        cloned_path or get_cache_path(
+            cache_dir,
+            get_repo_url_and_branch(formatted_git_arg)[0],
+            locked_repos[get_lock_key(formatted_git_arg)]["commit"],
+        )
+        for formatted_git_arg, cloned_path in zip(git_urls, cloned_paths)
+    ])
+
+    # modules are installed in config order once all clones are done
+    installed_repos = {}
+    for formatted_git_arg, cloned_path in zip(git_urls, cloned_paths):
+        lock_key = get_lock_key(formatted_git_arg)
+        if cloned_path is None:
+            installed_repos[lock_key] = locked_repos[lock_key]
+            continue
+
+        modules = get_modules_in_cloned_repo(cloned_path)
+        for each_module in modules:
+            install_module_from_cloned_repo(cloned_path, each_module)
+        installed_repos[lock_key] = {
+            "commit": os.path.basename(cloned_path),
+            "modules": modules,
+            "requirements": read_module_requirements(cloned_path),
+        }
         logger.info("Cloning successful!")
-        helpers.remove_directory_with_contents(cloned_path)
+
+    installed_modules = set()
+    for each_repo in installed_repos.values():
+        installed_modules.update(each_repo["modules"])
+    for each_repo in locked_repos.values():
+        for each_module in set(each_repo["modules"]) - installed_modules:
+            helpers.remove_directory_with_contents(
+                f"Access/access_modules/{each_module}")
+
+    requirements = merge_requirements(installed_repos)
+    if (
+        not locked_repos
+        or requirements != merge_requirements(locked_repos)
+        or not os.path.isfile(requirements_file_path)
+    ):
+        helpers.write_content_to_file(requirements_file_path, requirements)
+
+    if (
+        not locked_repos
+        or installed_repos != locked_repos
+        or not os.path.isfile(manifest_file_path)
+    ):
+        write_access_modules_manifest('Access/access_modules', manifest_file_path)
+
+    write_lockfile(
+        helpers.ACCESS_MODULES_LOCKFILE_PATH, {"repos": installed_repos})
 
 
 def __main__():
     logger.info("Starting cloning setup")
     try:
-        clone_access_modules()
+        clone_access_modules(sync="--sync" in sys.argv[1:])
     except Exception as exception:
         logger.exception("Access module cloning failed!")
         logger.exception(exception)
         sys.exit(1)
 
 
-__main__()
+if __name__ == "__main__":
+    __main__()
@@ -0,0 +1,95 @@
+""" Parse JSON config files once per process and hand out read-only copies """
+import copy
+import json
+import os
+import threading
+
+CONFIG_FILE_PATH = "config.json"
+
+
+def _read_only(*args, **kwargs):
+    raise TypeError("Config loaded from file is read-only")
+
+
+class FrozenDict(dict):
+    """ dict which can not be changed, it is still a dict for json and jsonschema """
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+    def __deepcopy__(self, memo):
+        return FrozenDict(copy.deepcopy(dict(self), memo))
+
+
+class FrozenList(list):
+    """ list which can not be changed, slicing it returns a mutable list """
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = remove = pop = clear = sort = reverse = _read_only
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+    def __deepcopy__(self, memo):
+        return FrozenList(copy.deepcopy(list(self), memo))
+
+
+def freeze(value):
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(each_value)) for key, each_value in value.items())
+    if isinstance(value, list):
+        return FrozenList(freeze(each_value) for each_value in value)
+    return value
+
+
+class ConfigFile:
+    """
+    JSON file parsed on first use. With hot_reload the file is parsed again
+    when its mtime changes, otherwise it is parsed once per process.
+    """
+
+    def __init__(self, path, hot_reload=False):
+        self.path = path
+        self.hot_reload = hot_reload
+        self._lock = threading.Lock()
+        self._data = None
+        self._mtime = None
+
+    def get(self):
+        if self._data is not None and not self.hot_reload:
+            return self._data
+
+        mtime = os.stat(self.path).st_mtime_ns
+        if self._data is None or mtime != self._mtime:
+            with self._lock:
+                if self._data is None or mtime != self._mtime:
+                    with open(self.path) as data_file:
+                        self._data = freeze(json.load(data_file))
+                    self._mtime = mtime
+        return self._data
+
+
+config_files = {}
+config_files_lock = threading.Lock()
+
+
+def get_config_file(path, hot_reload=False):
+    path = os.path.abspath(path)
+    if path not in config_files:
+        with config_files_lock:
+            if path not in config_files:
+                config_files[path] = ConfigFile(path, hot_reload=hot_reload)
+    return config_files[path]
+
+
+def load_json_file(path, hot_reload=False):
+    """ Read-only contents of a JSON file, parsed once per process """
+    return get_config_file(path, hot_reload=hot_reload).get()
+
+
+def get_config():
+    """ Read-only contents of config.json """
+    return load_json_file(CONFIG_FILE_PATH)
@@ -6,6 +6,9 @@ import shutil
 
 logger = logging.getLogger(__name__)
 
+# commit, modules and requirements installed from each access module repo
+ACCESS_MODULES_LOCKFILE_PATH = "Access/access_modules/modules.lock.json"
+
 
 def read_json_from_file(file_path):
     """ Wrapper helper to read json from file """
@@ -0,0 +1,63 @@
+import json
+import os
+import pickle
+import subprocess
+import sys
+
+import pytest
+
+from scripts import config_loader
+
+
+def _write_config(path, config, mtime):
+    path.write_text(json.dumps(config))
+    os.utime(path, ns=(mtime, mtime))
+
+
+@pytest.mark.parametrize(
+    "testName, hotReload, expectedName",
+    [
+        ("file is parsed once", False, "old"),
+        ("file is parsed again when mtime changes", True, "new"),
+    ],
+)
+def test_load_json_file(mocker, tmp_path, testName, hotReload, expectedName):
+    mocker.patch.object(config_loader, "config_files", {})
+    config_path = tmp_path / "config.json"
+    _write_config(config_path, {"name": "old"}, 1000000000)
+
+    config = config_loader.load_json_file(config_path, hot_reload=hotReload)
+    assert config_loader.load_json_file(config_path, hot_reload=hotReload) is config
+
+    _write_config(config_path, {"name": "new"}, 2000000000)
+    config = config_loader.load_json_file(config_path, hot_reload=hotReload)
+    assert config["name"] == expectedName
+
+
+def test_loaded_config_is_read_only(mocker, tmp_path):
+    mocker.patch.object(config_loader, "config_files", {})
+    config_path = tmp_path / "config.json"
+    _write_config(config_path, {"section": {"hosts": ["host1"]}}, 1000000000)
+
+    config = config_loader.load_json_file(config_path)
+
+    with pytest.raises(TypeError):
+        config["section"]["key"] = "value"
+    with pytest.raises(TypeError):
+        config["section"]["hosts"].append("host2")
+    # copies are mutable and the data stays plain json
+    hosts = config["section"]["hosts"][:]
+    hosts.append("host2")
+    assert json.loads(json.dumps(config)) == {"section": {"hosts": ["host1"]}}
+    assert pickle.loads(pickle.dumps(config)) == config
+
+
+def test_scripts_import_without_django_and_celery():
+    # the scripts run before the requirements of the app are installed
+    code = (
+        "import sys\n"
+        "sys.modules['celery'] = sys.modules['django'] = None\n"
+        "import scripts.clone_access_modules, scripts.validator\n"
+        "assert 'EnigmaAutomation' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
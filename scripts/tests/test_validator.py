@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from scripts import validator
+
+
+SCHEMA = {
+    "$schema": "https://json-schema.org/draft/2020-12/schema",
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "retries": {"type": "integer"},
+    },
+    "required": ["name", "retries"],
+}
+
+
+@pytest.fixture
+def enigma_path(monkeypatch, tmp_path):
+    (tmp_path / "Access" / "access_modules").mkdir(parents=True)
+    (tmp_path / "Access" / "access_modules" / "modules.lock.json").write_text(
+        json.dumps({"repos": {}})
+    )
+    (tmp_path / "schema.json").write_text(json.dumps(SCHEMA))
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("sys.argv", ["validator.py", "config.json"])
+    return tmp_path
+
+
+@pytest.mark.parametrize(
+    "testName, config, expectedErrors",
+    [
+        ("valid config", {"name": "enigma", "retries": 1}, []),
+        (
+            "all errors are reported",
+            {"retries": "one"},
+            [
+                "<root>: 'name' is a required property",
+                "retries: 'one' is not of type 'integer'",
+            ],
+        ),
+    ],
+)
+def test_validate_schema(mocker, enigma_path, testName, config, expectedErrors):
+    (enigma_path / "config.json").write_text(json.dumps(config))
+    merge_schema = mocker.spy(validator, "merge_schema")
+
+    for _ in range(2):
+        if expectedErrors:
+            with pytest.raises(Exception) as exception:
+                validator.validate_schema()
+            for expectedError in expectedErrors:
+                assert expectedError in str(exception.value)
+        else:
+            validator.validate_schema()
+
+    # the merged schema is cached until the lockfile changes
+    assert merge_schema.call_count == 1
@@ -1,21 +1,47 @@
 """ Script to validare the config.json file against the schema.json file. """
+import hashlib
+import json
 import logging
 import os
 import sys
-from jsonschema import validate
+from jsonschema.validators import validator_for
 
-from scripts.helpers import read_json_from_file
+from scripts.config_loader import load_json_file
+from scripts.helpers import (
+    ACCESS_MODULES_LOCKFILE_PATH,
+    read_json_from_file,
+    write_content_to_file,
+)
 
 logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level=logging.INFO,
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
 
+SCHEMA_FILE_PATH = "./schema.json"
+MERGED_SCHEMA_CACHE_PATH = "./Access/access_modules/.merged_schema.json"
 
-def validate_schema():
-    """ Core function to validate """
 
-    schema = read_json_from_file("./schema.json")
+def get_schema_cache_key():
+    """
+    Hash of the core schema and the access modules lockfile.
+    Without a lockfile the installed modules are unknown and nothing is cached.
+    """
+    if not os.path.isfile(ACCESS_MODULES_LOCKFILE_PATH):
+        return None
+    digest = hashlib.sha256()
+    for each_path in [SCHEMA_FILE_PATH, ACCESS_MODULES_LOCKFILE_PATH]:
+        with open(each_path, mode="rb") as read_file:
+            digest.update(read_file.read())
+    return digest.hexdigest()
 
-    config_file = "config.json" if len(sys.argv) <= 1 else sys.argv[1]
-    config = read_json_from_file("./" + config_file)
+
+def merge_schema():
+    """ Merge the schema of every access module into the core schema """
+    schema = read_json_from_file(SCHEMA_FILE_PATH)
 
     root_folders = [f.path for f in os.scandir("./Access/access_modules") if f.is_dir()]
     for folder in root_folders:
@@ -25,7 +51,53 @@ def validate_schema():
                 module_schema = read_json_from_file(module + "/schema.json")
                 schema["properties"].update(module_schema["properties"])
                 schema["required"] += module_schema["required"]
-    validate(instance=config, schema=schema)
+
+    validator_for(schema).check_schema(schema)
+    return schema
+
+
+def get_merged_schema():
+    """ Merged schema, rebuilt only when the schema or installed modules change """
+    cache_key = get_schema_cache_key()
+    if cache_key and os.path.isfile(MERGED_SCHEMA_CACHE_PATH):
+        cached_schema = read_json_from_file(MERGED_SCHEMA_CACHE_PATH)
+        if cached_schema["key"] == cache_key:
+            return cached_schema["schema"]
+
+    schema = merge_schema()
+    if cache_key:
+        write_content_to_file(
+            MERGED_SCHEMA_CACHE_PATH,
+            [json.dumps({"key": cache_key, "schema": schema})]
+        )
+    return schema
+
+
+def format_error(error):
+    """ Config path and message of a validation error """
+    path = "/".join(str(each_part) for each_part in error.absolute_path)
+    return f"{path or '<root>'}: {error.message}"
+
+
+def validate_schema():
+    """ Core function to validate """
+    config_file = "config.json" if len(sys.argv) <= 1 else sys.argv[1]
+    config = load_json_file("./" + config_file)
+
+    schema = get_merged_schema()
+    # the validator class matches the schema's $schema draft
+    validator = validator_for(schema)(schema)
+    errors = sorted(
+        validator.iter_errors(config),
+        key=lambda error: [str(each_part) for each_part in error.absolute_path],
+    )
+    if errors:
+        for error in errors:
+            logger.error("Schema error at %s", format_error(error))
+        raise Exception(
+            f"{len(errors)} schema errors: "
+            + "; ".join(format_error(error) for error in errors)
+        )
     logger.info("Schema validation passed!")
 
 
@@ -35,3 +107,7 @@ def __main__():
     except Exception as exception:
         logger.exception("Schema validation failed! Error is: %s", exception)
         sys.exit(1)
+
+
+if __name__ == "__main__":
+    __main__()